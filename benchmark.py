@@ -0,0 +1,257 @@
+import hashlib
+import os
+import time
+import timeit
+
+import numpy as np
+import pyglet
+import pymunk
+
+from source import constants as c
+from source import room_configurations as conf
+from source import tilemaps
+from source.cardsprite import CardSprite, CardSpriteLayer
+from source.layout import DungeonLayout, RoomLayout, executor
+from source.room import Room
+
+SEEDS = [0, 1, 2]
+LARGE_MAPS = {
+    "M_QUARTERS_LARGE": conf.M_QUARTERS_LARGE,
+    "M_CROSSROADS_LARGE": conf.M_CROSSROADS_LARGE,
+    "M_CORNER_LARGE_TL": conf.M_CORNER_LARGE_TL
+}
+
+
+def build_tilemap(map_data):
+    tilemap = tilemaps.create_blank(
+        map_data["width"],
+        map_data["height"],
+        margin=c.ROOM_BORDER
+    )
+    tilemap.update(tilemaps.to_map(map_data["matrix"]))
+    door_info = {
+        i: {"pos": 0, "floor": map_data["door_info"][i]["floor"]}
+        for i in range(4)
+    }
+    map_data = dict(map_data, door_info=door_info)
+    return tilemaps.add_boundaries(
+        c.FIGHT_ROOM,
+        tilemap,
+        {i: True for i in range(4)},
+        map_data
+    )
+
+
+def benchmark_autotile(number=20):
+    print("Autotiling (per room, ms):")
+    for name, map_data in LARGE_MAPS.items():
+        tilemap = build_tilemap(map_data)
+        connective = [
+            pos for pos, tile in tilemap.items() if
+            c.TILES[tile]["sprite"]["connective"]
+        ]
+
+        def per_tile():
+            return {
+                (x, y): tilemaps.image_index(tilemap, x, y)
+                for x, y in connective
+            }
+
+        def batch():
+            return tilemaps.autotile(tilemap)
+
+        indices = batch()
+        assert all(
+            indices[pos] == index for pos, index in per_tile().items()
+        )
+
+        old = min(timeit.repeat(per_tile, number=number)) / number * 1000
+        new = min(timeit.repeat(batch, number=number)) / number * 1000
+        print(
+            f"  {name}: {len(connective)} tiles, "
+            f"per tile {old:.2f}, batch {new:.2f} ({old/new:.1f}x)"
+        )
+
+
+def benchmark_generation(rooms=50):
+    print("Room generation (per room, ms / attempts mean, max):")
+    doors = {i: True for i in range(4)}
+    for name, config in {
+        "C_FIGHT_RANDOM": conf.C_FIGHT_RANDOM,
+        "C_FIGHT_SEMI_RANDOM": conf.C_FIGHT_SEMI_RANDOM,
+        "C_FIGHT_LARGE": conf.C_FIGHT_LARGE
+    }.items():
+        results = []
+        for mode in ("retry", "repair"):
+            attempts = []
+            start = time.perf_counter()
+            for i in range(rooms):
+                room = RoomLayout(
+                    c.FIGHT_ROOM, c.VOLCANO, config, doors,
+                    seed=f"bench/{i}", mode=mode
+                )
+                attempts.append(room.generation_attempts)
+            elapsed = (time.perf_counter() - start) / rooms * 1000
+            results.append(
+                f"{mode} {elapsed:.2f} / "
+                f"{sum(attempts)/rooms:.2f}, {max(attempts)}"
+            )
+        print(f"  {name}: " + ", ".join(results))
+
+
+def benchmark_seeds():
+    print("Seeded room generation (ms / digest):")
+    rooms = [
+        (style, room_type, config, doors)
+        for style in c.STYLES
+        for room_type, info in c.ROOM_INFO.items()
+        for config in info["configs"][style]
+        for doors in (
+            {i: True for i in range(4)},
+            {i: i % 2 == 0 for i in range(4)}
+        )
+    ]
+    for seed in SEEDS:
+        digests = {}
+        start = time.perf_counter()
+        for i, (style, room_type, config, doors) in enumerate(rooms):
+            room = RoomLayout(room_type, style, config, doors, f"{seed}/{i}")
+            digests[i] = room.tilemap.array.tobytes()
+        elapsed = (time.perf_counter() - start) * 1000
+
+        for i, (style, room_type, config, doors) in reversed(
+            list(enumerate(rooms))
+        ):
+            room = RoomLayout(room_type, style, config, doors, f"{seed}/{i}")
+            assert room.tilemap.array.tobytes() == digests[i]
+
+        digest = hashlib.sha1(b"".join(digests.values())).hexdigest()
+        print(f"  seed {seed}: {elapsed:.2f} / {digest[:12]}")
+
+
+def benchmark_dungeon():
+    print("DUNGEON_BIG room layouts (ms cold, warm / digest):")
+    layout = DungeonLayout(c.VOLCANO, c.DUNGEON_BIG, seed=0)
+    positions, arguments = layout.room_arguments()
+    for count in sorted({1, 2, 4, os.cpu_count()}):
+        if count == 1:
+            generate = map
+        else:
+            def generate(*arguments):
+                return executor(count).map(
+                    *arguments, chunksize=4
+                )
+        times = []
+        for run in range(2):
+            start = time.perf_counter()
+            rooms = list(generate(RoomLayout, *arguments))
+            times.append((time.perf_counter() - start) * 1000)
+        digest = hashlib.sha1(b"".join(
+            room.tilemap.array.tobytes() for room in rooms
+        )).hexdigest()
+        print(
+            f"  {count} workers: {times[0]:.2f}, {times[1]:.2f} / "
+            f"{digest[:12]}"
+        )
+
+
+def per_tile_space(layout):
+    space = pymunk.Space()
+    for x, y in layout.tilemap.positions(tilemaps.exposed(layout.tilemap)):
+        collider = c.TILES[layout.tilemap[(x, y)]]["collider"]
+        body = pymunk.Body(body_type=pymunk.Body.STATIC)
+        body.position = (x*c.TILE_SIZE, y*c.TILE_SIZE)
+        left, bottom = collider["x"], collider["y"]
+        right = left + collider["width"]
+        top = bottom + collider["height"]
+        shape = pymunk.Poly(
+            body,
+            [(left, bottom), (right, bottom), (right, top), (left, top)],
+            radius=collider["radius"]
+        )
+        space.add(body, shape)
+    return space
+
+
+def benchmark_colliders(steps=500):
+    print("Room colliders (shapes / space.step us):")
+    for name, config in {
+        "C_FIGHT_RANDOM": conf.C_FIGHT_RANDOM,
+        "C_FIGHT_LARGE": conf.C_FIGHT_LARGE
+    }.items():
+        layout = RoomLayout(
+            c.FIGHT_ROOM, c.VOLCANO, config,
+            {i: True for i in range(4)}, seed=0
+        )
+        room = Room(None, layout, None)
+        room.create_space()
+        results = []
+        for label, space in (
+            ("per tile", per_tile_space(layout)),
+            ("merged", room.space)
+        ):
+            player = pymunk.Body(1, float("inf"))
+            player.velocity = (400, 250)
+            shape = pymunk.Circle(player, c.PLAYER_COLLIDER["radius"])
+            space.add(player, shape)
+            start = time.perf_counter()
+            for i in range(steps):
+                space.step(1/144)
+            elapsed = (time.perf_counter() - start) / steps * 1e6
+            results.append(f"{label} {len(space.shapes)} / {elapsed:.1f}")
+        print(f"  {name}: " + ", ".join(results))
+
+
+def benchmark_card_sprites(count=10000, frames=20):
+    print(f"Moving {count} card sprites (ms per frame):")
+    window = pyglet.window.Window(visible=False)
+    image = pyglet.image.SolidColorImagePattern(
+        (255, 255, 255, 255)
+    ).create_image(16, 25).get_texture()
+    positions = np.random.default_rng(0).random((frames, count, 2)) * 1000
+
+    batch = pyglet.graphics.Batch()
+    sprites = [
+        CardSprite(image, batch=batch, subpixel=True) for i in range(count)
+    ]
+    start = time.perf_counter()
+    for frame in positions:
+        for sprite, (x, y) in zip(sprites, frame.tolist()):
+            sprite.update(x=x, y=y)
+    per_sprite = (time.perf_counter() - start) / frames * 1000
+    for sprite in sprites:
+        sprite.delete()
+
+    batch = pyglet.graphics.Batch()
+    layer = CardSpriteLayer(image, batch=batch, subpixel=True, capacity=count)
+    slots = [layer.add(image) for i in range(count)]
+    start = time.perf_counter()
+    for frame in positions:
+        for i, (x, y) in zip(slots, frame.tolist()):
+            layer.position[i] = x, y
+        layer.invalidate()
+        layer.update()
+    per_slot = (time.perf_counter() - start) / frames * 1000
+
+    start = time.perf_counter()
+    for frame in positions:
+        layer.position[slots] = frame
+        layer.invalidate()
+        layer.update()
+    bulk = (time.perf_counter() - start) / frames * 1000
+    layer.delete()
+    window.close()
+
+    print(
+        f"  CardSprite {per_sprite:.1f}, layer slots {per_slot:.1f}, "
+        f"layer arrays {bulk:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    benchmark_autotile()
+    benchmark_generation()
+    benchmark_seeds()
+    benchmark_dungeon()
+    benchmark_colliders()
+    benchmark_card_sprites()
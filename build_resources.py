@@ -0,0 +1,28 @@
+"""Build the cached tileset manifests ahead of time.
+
+The game builds a style's manifest on first use when it is missing or
+out of date; running this after editing a tileset saves that cost.
+"""
+import time
+
+import pyglet
+
+from source import constants as c
+from source import manifest
+
+
+def build_all():
+    for style in c.STYLES:
+        start = time.perf_counter()
+        pages, index = manifest.build_manifest(style)
+        print(
+            f"style {style}: {len(pages)} page(s) "
+            f"{[page.shape[:2][::-1] for page in pages]}, "
+            f"{(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    # Building only decodes and slices pixels, so no display is needed
+    pyglet.options["shadow_window"] = False
+    build_all()
@@ -1,5 +1,6 @@
 
 
+import concurrent.futures
 import json
 
 import pyglet
@@ -34,6 +35,7 @@ class Application:
         self.mouse_handler = mouse.MouseStateHandler()
 
         self.fps_display = pyglet.window.FPSDisplay(window=self.window)
+        self.debug_label = pyglet.text.Label(x=10, y=50)
 
         self.world_camera = source.camera.Camera(0, 0, 1000)
         self.lock_to_player = False
@@ -41,15 +43,18 @@ class Application:
         self.camera_movement_y = 0
         self.zoom = 1
 
-        self.world_batch = pyglet.graphics.Batch()
+        # Physics runs at a fixed step, sprites are drawn between steps
+        self.physics_time = 0
+        self.interpolation = 1
+
         self.ui_batch = pyglet.graphics.Batch()
 
-        self.particles = []
         self.handlers = []
         self.trigger_ids = []
 
         self.push_handlers(self, self.key_handler, self.mouse_handler)
 
+        self.stream = source.resources.AssetStream()
         self.create_layers()
         self.load_resources()
 
@@ -58,13 +63,22 @@ class Application:
         self.world = source.dungeon.Dungeon(self, c.HUB)
         self.player = source.player.Player(self)
 
+        self.world_generator = concurrent.futures.ThreadPoolExecutor(1)
+        self.next_world = None
+        self.next_style = None
+        self.generate_next_world()
+
     def create_layers(self):
         self.layers = {}
 
         world = {}
         world["master"] = pyglet.graphics.Group()
         for layer in c.WORLD_LAYERS:
-            world[layer] = pyglet.graphics.OrderedGroup(
+            if layer in c.CARD_LAYERS:
+                group = source.cardsprite.CardStateGroup
+            else:
+                group = pyglet.graphics.OrderedGroup
+            world[layer] = group(
                 c.WORLD_LAYERS.index(layer)+1, world["master"]
             )
         self.layers["world"] = world
@@ -80,105 +94,11 @@ class Application:
     def load_resources(self):
         self.resources = {}
 
-        tiles = {}
-        for style in c.STYLES:
-            tiles[style] = {}
-            for tile in c.TILES.keys():
-                tile_width = c.TILES[tile]["sprite"]["width"]
-                tile_height = c.TILES[tile]["sprite"]["height"]
-                image = pyglet.resource.image(
-                    f"resources/tilesets/{style}/{tile}.png"
-                )
-                try:
-                    data_path = f"resources/tilesets/{style}/{tile}.json"
-                    with open(data_path, "r") as f:
-                        data = json.load(f)
-
-                    sprite_sheet = pyglet.image.ImageGrid(
-                        image,
-                        len(data["animations"]),
-                        data["max_length"],
-                        item_width=data["frame"][0],
-                        item_height=data["frame"][1]
-                    )
-
-                    if c.TILES[tile]["sprite"]["connective"]:
-                        frame_grids = []
-                        for frame in range(sprite_sheet.__len__()):
-                            frame_grids.append(
-                                pyglet.image.ImageGrid(
-                                    sprite_sheet[frame],
-                                    c.TILESET_DIMENSIONS[1],
-                                    c.TILESET_DIMENSIONS[0],
-                                    item_width=tile_width,
-                                    item_height=tile_height
-                                )
-                            )
-
-                        image_grid = {}
-                        for index in range(frame_grids[0].__len__()):
-                            tile_frames = []
-                            for i in range(data["animations"][0]["length"]):
-                                tile_frames.append(
-                                    frame_grids[i][index]
-                                )
-                            frame_length = data["animations"][0]["frame_length"]  # noqa: E501
-                            image_grid[index] = pyglet.image.Animation.from_image_sequence(  # noqa: E501
-                                tile_frames,
-                                frame_length,
-                                loop=data["animations"][0]["loop"]
-                            )
-                    else:
-                        frame_grids = []
-                        for frame in range(sprite_sheet.__len__()):
-                            frame_grids.append(
-                                pyglet.image.ImageGrid(
-                                    sprite_sheet[frame],
-                                    image.height // tile_height,
-                                    image.width // tile_width,
-                                    item_width=tile_width,
-                                    item_height=tile_height
-                                )
-                            )
-
-                        image_grid = []
-                        for index in range(frame_grids[0].__len__()):
-                            tile_frames = []
-                            for i in range(data["animations"][0]["length"]):
-                                tile_frames.append(
-                                    frame_grids[i][index]
-                                )
-                            frame_length = data["animations"][0]["frame_length"]  # noqa: E501
-                            image_grid.append(
-                                pyglet.image.Animation.from_image_sequence(
-                                    tile_frames,
-                                    frame_length,
-                                    loop=data["animations"][0]["loop"]
-                                )
-                            )
-
-                except FileNotFoundError:
-                    if c.TILES[tile]["sprite"]["connective"]:
-                        image_grid = pyglet.image.ImageGrid(
-                            image,
-                            c.TILESET_DIMENSIONS[1],
-                            c.TILESET_DIMENSIONS[0],
-                            item_width=c.TILES[tile]["sprite"]["width"],
-                            item_height=c.TILES[tile]["sprite"]["height"]
-                        )
-                    else:
-                        image_grid = pyglet.image.ImageGrid(
-                            image,
-                            image.height // c.TILES[tile]["sprite"]["height"],
-                            image.width // c.TILES[tile]["sprite"]["width"],
-                            item_width=c.TILES[tile]["sprite"]["width"],
-                            item_height=c.TILES[tile]["sprite"]["height"]
-                        )
-
-                tiles[style][tile] = image_grid
-        self.resources["tiles"] = tiles
-
-        image = pyglet.resource.image(
+        self.resources["tiles"] = source.resources.ResourceManager(
+            stream=self.stream
+        )
+
+        image = source.resources.load(
             "resources/sprites/player.png"
         )
         with open("resources/sprites/player.json", "r") as f:
@@ -186,15 +106,14 @@ class Application:
         anim = self.load_animation(image, data)
         self.resources["player"] = anim
 
-        image = pyglet.resource.image(
-            "resources/sprites/portal_platform.png"
+        def portal_platform_loaded(anim):
+            self.resources["portal_platform"] = anim
+        self.stream_animation(
+            "resources/sprites/portal_platform",
+            portal_platform_loaded
         )
-        with open("resources/sprites/portal_platform.json", "r") as f:
-            data = json.load(f)
-        anim = self.load_animation(image, data)
-        self.resources["portal_platform"] = anim
 
-        image = pyglet.resource.image(
+        image = source.resources.load(
             "resources/tilesets/2/particles/bubble.png"
         )
         with open("resources/tilesets/2/particles/bubble.json", "r") as f:
@@ -205,35 +124,70 @@ class Application:
         ui = {}
 
         ui["map"] = {}
-        ui["map"]["window"] = pyglet.resource.image(
+        ui["map"]["window"] = source.resources.image(
             "resources/ui/map_window.png"
         )
-        image = pyglet.resource.image(
+        # The minimap composites these on the CPU, so they stay unpacked
+        image = source.resources.load(
             "resources/ui/map_rooms.png"
         )
-        image_grid = pyglet.image.ImageGrid(
+        ui["map"]["rooms"] = pyglet.image.ImageGrid(
             image,
             4, 16
         )
-        ui["map"]["rooms"] = pyglet.image.TextureGrid(image_grid)
-        image = pyglet.resource.image(
+        image = source.resources.load(
             "resources/ui/map_icons.png"
         )
-        image_grid = pyglet.image.ImageGrid(
+        ui["map"]["icons"] = pyglet.image.ImageGrid(
             image,
             1, 5
         )
-        ui["map"]["icons"] = pyglet.image.TextureGrid(image_grid)
 
-        image = pyglet.resource.image("resources/transition.png")
+        # Shown black until the full sheet has streamed in
         with open("resources/transition.json", "r") as f:
             data = json.load(f)
-        ui["transition"] = self.load_animation(image, data)
+        ui["transition"] = self.placeholder_animation(data)
+        self.stream_animation(
+            "resources/transition",
+            self.transition_loaded
+        )
 
         self.resources["ui"] = ui
 
+    def stream_animation(self, path, callback):
+        """Stream in a sprite sheet, calling `callback` with its
+        animations once they are uploaded.
+        """
+        def decode():
+            image = source.resources.load(f"{path}.png")
+            with open(f"{path}.json", "r") as f:
+                return image, json.load(f)
+        return self.stream.submit(
+            decode,
+            lambda sheet: self.load_animation(*sheet),
+            callback
+        )
+
+    def placeholder_animation(self, data):
+        """Black stand-ins with the same timings as a sheet's animations."""
+        image = source.resources.placeholder(*data["frame"])
+        animations = {}
+        for animation_data in data["animations"]:
+            animations[
+                animation_data["alias"]
+            ] = pyglet.image.Animation.from_image_sequence(
+                [image] * animation_data["length"],
+                animation_data["frame_length"],
+                loop=animation_data["loop"]
+            )
+        return animations
+
+    def transition_loaded(self, states):
+        self.resources["ui"]["transition"] = states
+        self.transition.set_states(states)
+
     def load_animation(self, image, data):
-        sprite_sheet = pyglet.image.ImageGrid(
+        sprite_sheet = source.resources.grid(
             image,
             len(data["animations"]),
             data["max_length"]
@@ -257,7 +211,24 @@ class Application:
         return animations
 
     def update(self, dt):
-        self.room.space.step(dt)
+        self.stream.update()
+
+        self.physics_time += dt
+        steps = 0
+        while (
+            self.physics_time >= c.PHYSICS_STEP and
+            steps < c.MAX_PHYSICS_STEPS
+        ):
+            self.player.update(c.PHYSICS_STEP)
+            self.room.space.step(c.PHYSICS_STEP)
+            self.physics_time -= c.PHYSICS_STEP
+            steps += 1
+        # Drop the backlog rather than spiral after a long frame
+        self.physics_time = min(self.physics_time, c.PHYSICS_STEP)
+        self.interpolation = self.physics_time / c.PHYSICS_STEP
+        self.player._update_sprite()
+        self.room.particles.update(dt)
+
         rezoom = False
         if self.key_handler[key.EQUAL]:
             self.zoom += 2 * dt
@@ -278,17 +249,29 @@ class Application:
                 self.world_camera.zoom = round(zoom*4)/4
 
         self.position_camera(dt=dt)
-        self.player.update(dt)
 
     def on_draw(self):
         self.window.clear()
+        self.room.cull(*self.view_rect())
+        self.room.update_sprites()
         with self.world_camera:
-            self.world_batch.draw()
             if self.debug_mode:
+                gl_calls = source.debug.count_gl_calls(self.room.batch.draw)
                 debug_options = pymunk.pyglet_util.DrawOptions()
                 self.room.space.debug_draw(debug_options)
+            else:
+                self.room.batch.draw()
         self.ui_batch.draw()
         self.fps_display.draw()
+        if self.debug_mode:
+            stats = source.debug.batch_stats(self.room.batch)
+            self.debug_label.text = (
+                "draw calls: {draw_calls}  "
+                "state changes: {state_changes}  "
+                "texture binds: {texture_binds}  "
+                "gl calls: {gl_calls}"
+            ).format(gl_calls=sum(gl_calls.values()), **stats)
+            self.debug_label.draw()
 
     def on_key_press(self, symbol, modifiers):
         if symbol == key.F11:
@@ -302,19 +285,40 @@ class Application:
             self.lock_to_player = not self.lock_to_player
         elif symbol == key.F1:
             def on_black():
-                style = self.world.style
-                style += 1
-                if style > c.VOLCANO:
-                    style = c.HUB
+                try:
+                    layout = self.next_world.result()
+                except Exception:
+                    # Generate the dungeon here rather than leave the
+                    # transition stuck on black.
+                    layout = source.layout.generate(self.next_style)
 
+                self.player.leave_world()
                 self.world.delete()
                 del self.world
-                self.world = source.dungeon.Dungeon(self, style)
-                self.player.room = (0, 0)
-                self.player.position = (0, 0)
-                self.room.space.add(self.player, self.player.collider)
+                self.world = source.dungeon.Dungeon(
+                    self, layout.style, layout=layout
+                )
+                self.player.enter_world()
+                self.generate_next_world()
 
-            self.transition.begin(on_black=on_black)
+            self.transition.begin(
+                on_black=on_black,
+                hold=lambda: not self.next_world.done()
+            )
+
+    def generate_next_world(self):
+        """Start generating the next dungeon's layout in the background."""
+        style = self.world.style
+        style += 1
+        if style > c.VOLCANO:
+            style = c.HUB
+
+        self.next_style = style
+        self.next_world = self.world_generator.submit(
+            source.layout.generate,
+            style
+        )
+        self.resources["tiles"].preload(style)
 
     def on_mouse_press(self, x, y, button, modifiers):
         if button == mouse.LEFT and self.debug_mode:
@@ -347,22 +351,31 @@ class Application:
 
         return world_x, world_y
 
+    def view_rect(self):
+        """The area of the world the camera can see."""
+        left, bottom = self.screen_to_world(0, 0)
+        right, top = self.screen_to_world(
+            self.window.width, self.window.height
+        )
+        return left, bottom, right, top
+
     def position_camera(self, parallax=True, dt=1/60):
         x = (-self.window.width//2 + c.TILE_SIZE/2)/self.world_camera.zoom
         y = (-self.window.height//2 + c.TILE_SIZE/2)/self.world_camera.zoom
+        position = self.player.interpolated_position
 
         if parallax:
             # Player Position
             if self.lock_to_player:
-                x += self.player.position.x + c.TILE_SIZE/2
-                y += self.player.position.y
+                x += position.x + c.TILE_SIZE/2
+                y += position.y
             else:
                 x += (
-                    (self.player.position.x) * 0.5 *
+                    (position.x) * 0.5 *
                     self.room.width/c.PARALLAX_X
                 )
                 y += (
-                    (self.player.position.y) * 0.5 *
+                    (position.y) * 0.5 *
                     self.room.height/c.PARALLAX_Y
                 )
 
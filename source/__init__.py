@@ -1,9 +1,20 @@
-from . import (basic, camera, cardsprite, constants, dungeon, hub_world,
-               particle, player, room, room_configurations, tile, tilemaps,
-               trigger, ui)
+import importlib
 
+# Submodules are imported on first access, so tools that only need
+# generation (constants, layout, tilemaps) never pull in pyglet
 submodules = [
-    basic, camera, cardsprite, constants, dungeon, hub_world,
-    particle, player, room, room_configurations, tile, tilemaps,
-    trigger, ui
+    "animation", "basic", "camera", "cardsprite", "constants", "debug",
+    "dungeon", "hub_world", "layout", "manifest", "particle", "player",
+    "resources", "room", "room_configurations", "tile", "tilemaps",
+    "trigger", "ui"
 ]
+
+
+def __getattr__(name):
+    if name in submodules:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + submodules)
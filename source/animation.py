@@ -0,0 +1,126 @@
+import numpy as np
+import pyglet
+
+
+def frame_tex_coords(animation):
+    """The texture coordinates of every frame of an animation.
+
+    All frames must be on one texture, as only the coordinates change.
+    """
+    texture = animation.frames[0].image.get_texture()
+    tex_coords = []
+    for frame in animation.frames:
+        frame_texture = frame.image.get_texture()
+        if frame_texture.id != texture.id:
+            raise ValueError("Animation frames are on different textures.")
+        tex_coords.append(frame_texture.tex_coords)
+    return np.array(tex_coords, dtype=np.float32)
+
+
+class AnimationTrack:
+    """Animations with the same frame timings, stepped together.
+
+    Connective tilesets hold one Animation per tile index, all sharing
+    their timings, so a single clock callback keeps every tile of that
+    type in phase.  Each frame, the texture coordinates of every sprite
+    layer and baked vertex list on the track are written in one
+    assignment from a table of all their frames.
+    """
+
+    def __init__(self, durations):
+        self.durations = durations
+        self.layers = {}
+        self.layer_tables = None
+        self.vertex_lists = []
+        self.frame_index = 0
+        self.next_dt = durations[0]
+        self.playing = False
+
+    def add_sprite(self, animation, sprite):
+        """Animate a `CardSpriteView`."""
+        if sprite.layer not in self.layers:
+            self.layers[sprite.layer] = ([], [])
+        slots, tables = self.layers[sprite.layer]
+        slots.append(sprite.index)
+        tables.append(frame_tex_coords(animation))
+        self.layer_tables = None
+        sprite.image = animation.frames[self.frame_index].image
+
+    def add_vertex_list(self, vertex_list, animations):
+        """Animate a vertex list of quads, one animation per quad."""
+        table = np.stack(
+            [frame_tex_coords(animation) for animation in animations],
+            axis=1
+        ).reshape(len(self.durations), -1)
+        self.vertex_lists.append((vertex_list, table))
+        np.ctypeslib.as_array(vertex_list.tex_coords)[:] = (
+            table[self.frame_index]
+        )
+
+    def play(self):
+        if self.playing or not self.next_dt:
+            return
+        self.playing = True
+        pyglet.clock.schedule_once(self._animate, self.next_dt)
+
+    def stop(self):
+        self.playing = False
+        pyglet.clock.unschedule(self._animate)
+
+    def _animate(self, dt):
+        self.frame_index += 1
+        if self.frame_index >= len(self.durations):
+            self.frame_index = 0
+
+        if self.layer_tables is None:
+            self.layer_tables = [
+                (layer, np.array(slots), np.stack(tables, axis=1))
+                for layer, (slots, tables) in self.layers.items()
+            ]
+        for layer, slots, table in self.layer_tables:
+            layer.set_tex_coords(slots, table[self.frame_index])
+        for vertex_list, table in self.vertex_lists:
+            np.ctypeslib.as_array(vertex_list.tex_coords)[:] = (
+                table[self.frame_index]
+            )
+
+        duration = self.durations[self.frame_index]
+        if duration is not None:
+            duration = duration - (self.next_dt - dt)
+            duration = min(max(0, duration), self.durations[self.frame_index])
+            pyglet.clock.schedule_once(self._animate, duration)
+            self.next_dt = duration
+        else:
+            self.playing = False
+
+
+class Animator:
+    """Drives every animated sprite in a room from shared tracks."""
+
+    def __init__(self):
+        self.tracks = {}
+
+    def track(self, animation):
+        """The track playing animations with `animation`'s timings."""
+        durations = tuple(frame.duration for frame in animation.frames)
+        if durations not in self.tracks:
+            self.tracks[durations] = AnimationTrack(durations)
+        return self.tracks[durations]
+
+    def add_sprite(self, animation, sprite):
+        self.track(animation).add_sprite(animation, sprite)
+
+    def add_vertex_list(self, vertex_list, animations):
+        self.track(animations[0]).add_vertex_list(vertex_list, animations)
+
+    def play(self):
+        for track in self.tracks.values():
+            track.play()
+
+    def stop(self):
+        for track in self.tracks.values():
+            track.stop()
+
+    def clear(self):
+        self.stop()
+        self.tracks = {}
@@ -15,11 +15,14 @@ class Basic(pymunk.Body):
         collider=None,
         collision_type=0,
         body_type=pymunk.Body.STATIC,
-        space=None
+        space=None,
+        batch=None
     ):
         self.application = application
         if space is None:
             space = self.application.room.space
+        if batch is None:
+            batch = self.application.room.batch
         super().__init__(
             mass=1,
             moment=float("inf"),
@@ -64,30 +67,48 @@ class Basic(pymunk.Body):
             self.sprite = CardSprite(
                 image,
                 x=self.position.x, y=self.position.y,
-                batch=self.application.world_batch,
+                batch=batch,
                 subpixel=True
             )
         else:
             self.sprite = pyglet.sprite.Sprite(
                 image,
                 x=self.position.x, y=self.position.y,
-                batch=self.application.world_batch,
+                batch=batch,
                 subpixel=True
             )
 
+    @property
+    def position(self):
+        return pymunk.Body.position.fget(self)
+
+    @position.setter
+    def position(self, position):
+        pymunk.Body.position.fset(self, position)
+        self.previous_position = self.position
+
+    @property
+    def interpolated_position(self):
+        """Position between the last two physics steps, for drawing."""
+        return self.previous_position.interpolate_to(
+            self.position,
+            self.application.interpolation
+        )
+
     def update(self, dt):
-        self._update_sprite()
+        self.previous_position = self.position
 
     def _update_sprite(self):
+        position = self.interpolated_position
         if self.flip:
             self.sprite.update(
-                x=self.position.x+self.sprite.width,
-                y=self.position.y,
+                x=position.x+self.sprite.width,
+                y=position.y,
             )
         else:
             self.sprite.update(
-                x=self.position.x,
-                y=self.position.y
+                x=position.x,
+                y=position.y
             )
 
     @property
@@ -1,5 +1,6 @@
 import math
 
+import numpy as np
 from pyglet.gl import *
 from pyglet import clock
 from pyglet import event
@@ -7,11 +8,55 @@ from pyglet import graphics
 from pyglet import image
 
 
+class CardStateGroup(graphics.OrderedGroup):
+    """Blend, depth and alpha test state for card sprites.
+
+    Set once for every card sprite beneath it, so the texture groups of the
+    sprites only need to bind their texture.  World layers holding card
+    sprites use this as their ordered layer group.
+    """
+
+    def __init__(self, order=0, parent=None,
+                 blend_src=GL_SRC_ALPHA,
+                 blend_dest=GL_ONE_MINUS_SRC_ALPHA):
+        super(CardStateGroup, self).__init__(order, parent)
+        self.blend_src = blend_src
+        self.blend_dest = blend_dest
+
+    def set_state(self):
+        glPushAttrib(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT |
+                     GL_ENABLE_BIT)
+        glEnable(GL_TEXTURE_2D)
+
+        glEnable(GL_BLEND)
+        glBlendFunc(self.blend_src, self.blend_dest)
+
+        glEnable(GL_DEPTH_TEST)
+        glDepthFunc(GL_LESS)
+
+        glEnable(GL_ALPHA_TEST)
+        glAlphaFunc(GL_GREATER, 0.01)
+
+    def unset_state(self):
+        glPopAttrib()
+
+    def __eq__(self, other):
+        return (super(CardStateGroup, self).__eq__(other) and
+                self.blend_src == other.blend_src and
+                self.blend_dest == other.blend_dest)
+
+    def __hash__(self):
+        return hash((self.order, self.parent,
+                     self.blend_src, self.blend_dest))
+
+
 class SpriteGroup(graphics.Group):
     """Shared sprite rendering group.
 
     The group is automatically coalesced with other sprite groups sharing the
-    same parent group, texture and blend parameters.
+    same parent group, texture and blend parameters.  It only binds the
+    texture; blend, depth and alpha state come from the nearest
+    `CardStateGroup` above it, which is added if the parent has none.
     """
 
     def __init__(self, texture, blend_src, blend_dest, parent=None):
@@ -32,42 +77,37 @@ class SpriteGroup(graphics.Group):
             `parent` : `Group`
                 Optional parent group.
         """
+        self.sprite_parent = parent
+        state = parent
+        while state is not None and not isinstance(state, CardStateGroup):
+            state = state.parent
+        if (
+            state is None or
+            state.blend_src != blend_src or
+            state.blend_dest != blend_dest
+        ):
+            parent = CardStateGroup(0, parent, blend_src, blend_dest)
         super(SpriteGroup, self).__init__(parent)
         self.texture = texture
         self.blend_src = blend_src
         self.blend_dest = blend_dest
 
     def set_state(self):
-        glEnable(self.texture.target)
         glBindTexture(self.texture.target, self.texture.id)
-        glPushAttrib(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-
-        glEnable(GL_BLEND)
-        glBlendFunc(self.blend_src, self.blend_dest)
-
-        glEnable(GL_DEPTH_TEST)
-        glDepthFunc(GL_LESS)
-
-        glEnable(GL_ALPHA_TEST)
-        glAlphaFunc(GL_GREATER, 0.01)
-
-    def unset_state(self):
-        glPopAttrib()
-        glDisable(self.texture.target)
 
     def __repr__(self):
         return '%s(%r)' % (self.__class__.__name__, self.texture)
 
     def __eq__(self, other):
         return (other.__class__ is self.__class__ and
-                self.parent is other.parent and
+                self.parent == other.parent and
                 self.texture.target == other.texture.target and
                 self.texture.id == other.texture.id and
                 self.blend_src == other.blend_src and
                 self.blend_dest == other.blend_dest)
 
     def __hash__(self):
-        return hash((id(self.parent),
+        return hash((self.parent,
                      self.texture.id, self.texture.target,
                      self.blend_src, self.blend_dest))
 
@@ -224,11 +264,11 @@ class CardSprite(event.EventDispatcher):
 
         :type: `Group`
         """
-        return self._group.parent
+        return self._group.sprite_parent
 
     @group.setter
     def group(self, group):
-        if self._group.parent == group:
+        if self._group.sprite_parent == group:
             return
         self._group = SpriteGroup(self._texture,
                                   self._group.blend_src,
@@ -270,7 +310,7 @@ class CardSprite(event.EventDispatcher):
             self._group = SpriteGroup(texture,
                                       self._group.blend_src,
                                       self._group.blend_dest,
-                                      self._group.parent)
+                                      self._group.sprite_parent)
             if self._batch is None:
                 self._vertex_list.tex_coords[:] = texture.tex_coords
             else:
@@ -575,3 +615,347 @@ class CardSprite(event.EventDispatcher):
 
 
 CardSprite.register_event_type('on_animation_end')
+
+
+class CardSpriteLayer:
+    """Many card sprites sharing one texture, updated in bulk.
+
+    Positions, rotations, scales, tilt and colours of every sprite are kept
+    in NumPy arrays, one slot per sprite.  `update` rebuilds all quads in
+    one vectorized pass and writes them into a single vertex list, instead
+    of one Python list per sprite per change.
+
+    `add` returns the slot of a new sprite, whose arrays may then be
+    written directly; call `invalidate` afterwards.  `add_sprite` returns
+    a `CardSpriteView` of the slot instead, with the properties of a
+    `CardSprite`.  Slots are reused through a free list.  Call `update`
+    once per frame, before the batch is drawn.
+    """
+
+    group_class = SpriteGroup
+
+    # Name, per sprite shape, type and initial value of every array.
+    arrays = (
+        ('used', (), bool, False),
+        ('position', (2,), np.float64, 0),
+        ('rotation', (), np.float64, 0),
+        ('scale', (), np.float64, 1),
+        ('scale_xy', (2,), np.float64, 1),
+        ('tilt', (), np.float64, 1),
+        ('visible', (), bool, True),
+        ('anchor', (2,), np.float64, 0),
+        ('size', (2,), np.float64, 0),
+        ('colors', (4,), np.uint8, 255),
+        ('tex_coords', (12,), np.float32, 0),
+    )
+
+    def __init__(self,
+                 texture,
+                 blend_src=GL_SRC_ALPHA,
+                 blend_dest=GL_ONE_MINUS_SRC_ALPHA,
+                 batch=None,
+                 group=None,
+                 usage='stream',
+                 subpixel=False,
+                 capacity=64):
+        """Create a sprite layer.
+
+        :Parameters:
+            `texture` : `Texture`
+                The texture (usually an atlas page) every sprite's image
+                must come from.
+            `blend_src` : int
+                OpenGL blend source mode.
+            `blend_dest` : int
+                OpenGL blend destination mode.
+            `batch` : `Batch`
+                Optional batch to add the layer to.
+            `group` : `Group`
+                Optional parent group of the layer.
+            `usage` : str
+                Vertex buffer object usage hint for vertex data.
+            `subpixel` : bool
+                Allow floating-point coordinates for the sprites.
+            `capacity` : int
+                Number of sprites to allocate room for up front.
+        """
+        self._texture = texture.get_texture()
+        self._group = self.group_class(
+            self._texture, blend_src, blend_dest, group
+        )
+        self._batch = batch
+        self._usage = usage
+        self._subpixel = subpixel
+
+        self.free = []
+        self._capacity = 0
+        self._vertex_list = None
+        self._allocate(capacity)
+
+    @property
+    def capacity(self):
+        """Number of slots currently allocated."""
+        return self._capacity
+
+    def _allocate(self, capacity):
+        for name, shape, dtype, fill in self.arrays:
+            grown = np.full((capacity,) + shape, fill, dtype=dtype)
+            if self._capacity:
+                grown[:self._capacity] = getattr(self, name)
+            setattr(self, name, grown)
+        self.free.extend(reversed(range(self._capacity, capacity)))
+
+        vertex_format = 'v3f/%s' % self._usage
+        if self._vertex_list is None:
+            if self._batch is None:
+                self._vertex_list = graphics.vertex_list(
+                    capacity * 4, vertex_format, 'c4B', 't3f')
+            else:
+                self._vertex_list = self._batch.add(
+                    capacity * 4, GL_QUADS, self._group,
+                    vertex_format, 'c4B', 't3f')
+        else:
+            self._vertex_list.resize(capacity * 4)
+        self._capacity = capacity
+        self.invalidate()
+
+    def add(self, img, x=0, y=0, tilt=1):
+        """Add a sprite showing `img` and return its slot."""
+        if not self.free:
+            self._allocate(max(1, self._capacity * 2))
+        i = self.free.pop()
+        for name, shape, dtype, fill in self.arrays:
+            getattr(self, name)[i] = fill
+        self.used[i] = True
+        self.position[i] = x, y
+        self.tilt[i] = tilt
+        self.set_image(i, img)
+        return i
+
+    def add_sprite(self, img, x=0, y=0, tilt=1):
+        """Add a sprite showing `img` and return a view of its slot."""
+        return CardSpriteView(self, self.add(img, x, y, tilt), img)
+
+    def set_image(self, i, img):
+        """Show `img`, which must be on the layer's texture, in slot `i`."""
+        texture = img.get_texture()
+        if texture.id != self._texture.id:
+            raise ValueError("Image is not on the layer's texture.")
+        self.anchor[i] = texture.anchor_x, texture.anchor_y
+        self.size[i] = texture.width, texture.height
+        self.tex_coords[i] = texture.tex_coords
+        self._vertices_dirty = True
+        self._tex_coords_dirty = True
+
+    def set_tex_coords(self, slots, tex_coords):
+        """Show other regions of the layer's texture in many slots at once."""
+        self.tex_coords[slots] = tex_coords
+        self._tex_coords_dirty = True
+
+    def remove(self, i):
+        """Remove the sprite in slot `i`, freeing the slot."""
+        self.used[i] = False
+        self.free.append(i)
+        self._vertices_dirty = True
+
+    def clear(self):
+        """Remove every sprite."""
+        self.used[:] = False
+        self.free = list(reversed(range(self._capacity)))
+        self._vertices_dirty = True
+
+    def invalidate(self):
+        """Mark every sprite as changed after writing the arrays directly."""
+        self._vertices_dirty = True
+        self._colors_dirty = True
+        self._tex_coords_dirty = True
+
+    def _compute_vertices(self):
+        scale = self.scale[:, None] * self.scale_xy
+        x1, y1 = (-self.anchor * scale).T
+        x2, y2 = (-self.anchor * scale + self.size * scale).T
+        corners_x = np.stack((x1, x2, x2, x1), axis=1)
+        corners_y = np.stack((y1, y1, y2, y2), axis=1)
+
+        r = -np.radians(self.rotation)[:, None]
+        cr = np.cos(r)
+        sr = np.sin(r)
+        x = self.position[:, 0, None]
+        y = self.position[:, 1, None]
+
+        vertices = np.zeros((self._capacity, 4, 3), dtype=np.float32)
+        vertices[:, :, 0] = corners_x * cr - corners_y * sr + x
+        vertices[:, :, 1] = corners_x * sr + corners_y * cr + y
+        vertices[:, 2:, 2] = self.tilt[:, None]
+        vertices[~(self.used & self.visible)] = 0
+        if not self._subpixel:
+            vertices = np.trunc(vertices)
+        return vertices
+
+    def _compute_colors(self):
+        return np.repeat(self.colors, 4, axis=0)
+
+    def update(self):
+        """Write every changed sprite attribute to the vertex list."""
+        if self._vertices_dirty:
+            vertices = np.ctypeslib.as_array(self._vertex_list.vertices)
+            vertices[:] = self._compute_vertices().ravel()
+            self._vertices_dirty = False
+        if self._colors_dirty:
+            colors = np.ctypeslib.as_array(self._vertex_list.colors)
+            colors[:] = self._compute_colors().ravel()
+            self._colors_dirty = False
+        if self._tex_coords_dirty:
+            tex_coords = np.ctypeslib.as_array(self._vertex_list.tex_coords)
+            tex_coords[:] = self.tex_coords.ravel()
+            self._tex_coords_dirty = False
+
+    def draw(self):
+        """Draw every sprite in the layer."""
+        self.update()
+        self._group.set_state_recursive()
+        self._vertex_list.draw(GL_QUADS)
+        self._group.unset_state_recursive()
+
+    def delete(self):
+        """Force immediate removal of the layer from video memory."""
+        self._vertex_list.delete()
+        self._vertex_list = None
+        self.free = []
+
+
+class CardSpriteView:
+    """One sprite in a `CardSpriteLayer`.
+
+    Has the main properties of `CardSprite`, but reads and writes the
+    layer's arrays; changes are drawn after the layer's next `update`.
+    """
+
+    __slots__ = ('_layer', '_index', '_image')
+
+    def __init__(self, layer, index, img):
+        self._layer = layer
+        self._index = index
+        self._image = img
+
+    def delete(self):
+        """Remove the sprite from its layer."""
+        self._layer.remove(self._index)
+        self._layer = None
+
+    @property
+    def layer(self):
+        """The layer holding the sprite."""
+        return self._layer
+
+    @property
+    def index(self):
+        """The sprite's slot in its layer."""
+        return self._index
+
+    @property
+    def image(self):
+        """Image to display, which must be on the layer's texture.
+
+        :type: `AbstractImage`
+        """
+        return self._image
+
+    @image.setter
+    def image(self, img):
+        self._layer.set_image(self._index, img)
+        self._image = img
+
+    @property
+    def position(self):
+        """The (x, y) coordinates of the sprite, as a tuple."""
+        x, y = self._layer.position[self._index]
+        return float(x), float(y)
+
+    @position.setter
+    def position(self, position):
+        self._layer.position[self._index] = position
+        self._layer._vertices_dirty = True
+
+    @property
+    def x(self):
+        """X coordinate of the sprite."""
+        return float(self._layer.position[self._index, 0])
+
+    @x.setter
+    def x(self, x):
+        self._layer.position[self._index, 0] = x
+        self._layer._vertices_dirty = True
+
+    @property
+    def y(self):
+        """Y coordinate of the sprite."""
+        return float(self._layer.position[self._index, 1])
+
+    @y.setter
+    def y(self, y):
+        self._layer.position[self._index, 1] = y
+        self._layer._vertices_dirty = True
+
+    @property
+    def rotation(self):
+        """Clockwise rotation of the sprite, in degrees."""
+        return float(self._layer.rotation[self._index])
+
+    @rotation.setter
+    def rotation(self, rotation):
+        self._layer.rotation[self._index] = rotation
+        self._layer._vertices_dirty = True
+
+    @property
+    def scale(self):
+        """Scaling factor."""
+        return float(self._layer.scale[self._index])
+
+    @scale.setter
+    def scale(self, scale):
+        self._layer.scale[self._index] = scale
+        self._layer._vertices_dirty = True
+
+    @property
+    def tilt(self):
+        """Depth of the top edge of the card."""
+        return float(self._layer.tilt[self._index])
+
+    @tilt.setter
+    def tilt(self, tilt):
+        self._layer.tilt[self._index] = tilt
+        self._layer._vertices_dirty = True
+
+    @property
+    def opacity(self):
+        """Blend opacity, from 0 to 255."""
+        return int(self._layer.colors[self._index, 3])
+
+    @opacity.setter
+    def opacity(self, opacity):
+        self._layer.colors[self._index, 3] = int(opacity)
+        self._layer._colors_dirty = True
+
+    @property
+    def visible(self):
+        """True if the sprite will be drawn."""
+        return bool(self._layer.visible[self._index])
+
+    @visible.setter
+    def visible(self, visible):
+        self._layer.visible[self._index] = visible
+        self._layer._vertices_dirty = True
+
+    def update(self, x=None, y=None, rotation=None, scale=None):
+        """Change simultaneously the position, rotation and scale."""
+        layer = self._layer
+        if x is not None:
+            layer.position[self._index, 0] = x
+        if y is not None:
+            layer.position[self._index, 1] = y
+        if rotation is not None:
+            layer.rotation[self._index] = rotation
+        if scale is not None:
+            layer.scale[self._index] = scale
+        layer._vertices_dirty = True
@@ -3,6 +3,8 @@ from . import room_configurations as conf
 # Window
 MIN_SIZE = (568, 320)
 UPDATE_SPEED = 1/144
+PHYSICS_STEP = 1/60
+MAX_PHYSICS_STEPS = 5
 MIN_ZOOM = 0.25
 MAX_ZOOM = 2
 PARALLAX_X = 70
@@ -16,13 +18,37 @@ WORLD_LAYERS = [
     "y_ordered",
     "a_particles"
 ]
+# Layers of card sprites, which share one blend/depth state group.
+CARD_LAYERS = ["y_ordered", "a_particles"]
 UI_LAYERS = [
     "transition",
     "map_window",
     "map_rooms",
-    "map_icons",
 ]
 
+# Resources
+# Every image is packed into shared atlas pages of this size.
+ATLAS_SIZE = 2048
+ATLAS_BORDER = 1
+# Tilesets are loaded per style into atlas pages of their own. Styles
+# loaded ahead of use are kept up to this many bytes of textures.
+TILESET_ATLAS_SIZE = 1024
+TILESET_BUDGET = 2 * TILESET_ATLAS_SIZE**2 * 4
+# Sliced tilesets are cached here, see build_resources.py
+CACHE_PATH = "cache"
+MANIFEST_VERSION = 1
+# Decoded assets uploaded per frame while streaming
+STREAM_UPLOADS = 1
+
+# Rendering
+# Room tiles are grouped into square chunks of this many tiles, and only
+# chunks inside the camera's view are drawn.
+CHUNK_SIZE = 16
+
+# Particles
+# Slots preallocated per particle pool, doubled when they run out.
+PARTICLE_CAPACITY = 64
+
 # Player
 PLAYER_SPEED = 3200
 PLAYER_COLLIDER = {
@@ -50,6 +76,7 @@ STYLES = [HUB, ICE, VOLCANO]
 
 # Tile Types
 TILE_SIZE = 16
+ROOM_BORDER = 3
 VOID = -1
 FLOOR = 0
 WALL = 1
@@ -123,6 +150,16 @@ TILES = {
     }
 }
 
+# Room Generation
+# "repair" carves paths to unreachable doors, "retry" regenerates the room.
+GENERATION_MODE = "repair"
+# Room layouts are generated in a process pool, None uses every core.
+GENERATION_WORKERS = None
+# Dungeons with fewer rooms per worker are generated serially.
+GENERATION_ROOMS_PER_WORKER = 2
+# Rooms are built when nearby, the least recently visited are dropped.
+MAX_BUILT_ROOMS = 12
+
 # Room Types
 START_ROOM = 0
 FIGHT_ROOM = 1
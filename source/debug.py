@@ -0,0 +1,70 @@
+import collections
+
+import pyglet
+
+from . import cardsprite
+
+# Modules whose GL calls make up a batch draw.
+GL_MODULES = [
+    cardsprite,
+    pyglet.graphics,
+    pyglet.graphics.vertexattribute,
+    pyglet.graphics.vertexbuffer,
+    pyglet.graphics.vertexdomain,
+    pyglet.sprite
+]
+
+
+def batch_stats(batch):
+    """Count the GL work a batch does each time it is drawn.
+
+    Walks the batch's group tree in draw order, counting a draw call per
+    non-empty vertex domain, a state change per group that overrides
+    `set_state`, and a texture bind whenever the bound texture changes.
+    """
+    stats = {"draw_calls": 0, "state_changes": 0, "texture_binds": 0}
+    bound = None
+
+    def visit(group):
+        nonlocal bound
+        if type(group).set_state is not pyglet.graphics.Group.set_state:
+            stats["state_changes"] += 1
+        texture = getattr(group, "texture", None)
+        if texture is not None and texture.id != bound:
+            stats["texture_binds"] += 1
+            bound = texture.id
+        for domain in batch.group_map.get(group, {}).values():
+            if not domain._is_empty():
+                stats["draw_calls"] += 1
+        for child in sorted(batch.group_children.get(group, [])):
+            if child.visible:
+                visit(child)
+
+    for group in sorted(batch.top_groups):
+        if group.visible:
+            visit(group)
+    return stats
+
+
+def count_gl_calls(draw):
+    """Call `draw`, counting the GL functions it calls by name."""
+    counts = collections.Counter()
+
+    def counted(name, function):
+        def call(*args):
+            counts[name] += 1
+            return function(*args)
+        return call
+
+    originals = []
+    for module in GL_MODULES:
+        for name, value in list(vars(module).items()):
+            if name.startswith("gl") and callable(value):
+                originals.append((module, name, value))
+                setattr(module, name, counted(name, value))
+    try:
+        draw()
+    finally:
+        for module, name, value in originals:
+            setattr(module, name, value)
+    return counts
@@ -0,0 +1,296 @@
+import concurrent.futures
+import copy
+import multiprocessing
+import os
+import random
+
+from . import constants as c
+from . import tilemaps
+
+_executor = None
+_executor_workers = 0
+
+
+def executor(workers):
+    """Return the process pool shared by every dungeon's generation.
+
+    Workers are spawned rather than forked, so the pool can be started
+    from a thread of a process holding a GL context.
+    """
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers != workers:
+        if _executor is not None:
+            _executor.shutdown()
+        # Spawned workers re-import the main module; keep pyglet from
+        # opening a window in them
+        os.environ["PYGLET_SHADOW_WINDOW"] = "False"
+        _executor = concurrent.futures.ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        _executor_workers = workers
+    return _executor
+
+
+def generate(style, config=None, seed=None, workers=None, mode=None):
+    """Return a `DungeonLayout` with the layout of every room generated."""
+    layout = DungeonLayout(style, config, seed, mode)
+    layout.generate_rooms(workers)
+    return layout
+
+
+class DungeonLayout:
+    """The generated data of a dungeon, without any physics or graphics.
+
+    Room layouts are generated in a process pool, see `generate_rooms`.
+    """
+
+    def __init__(self, style, config=None, seed=None, mode=None):
+        self.style = style
+
+        if mode is None:
+            mode = c.GENERATION_MODE
+        self.mode = mode
+
+        if config is None:
+            config = c.DUNGEON_BASE
+        self.config = copy.deepcopy(config)
+        self.size = self.config["size"]
+
+        if seed is None:
+            seed = random.getrandbits(32)
+        self.seed = seed
+        self.random = random.Random(self.seed)
+
+        self.rooms = {}
+        self.generate_map()
+
+    def generate_map(self):
+        self.gen_map = {}
+        neighbours = {
+            (1, 0): (1, 3),
+            (-1, 0): (3, 1),
+            (0, -1): (2, 0),
+            (0, 1): (0, 2)
+        }
+        self.gen_map[(0, 0)] = {
+            "type": c.START_ROOM,
+            "doors": {i: False for i in range(4)}
+        }
+
+        config = copy.deepcopy(self.config)
+        while len(config["rooms"]) > 0:
+            room_type = self.random.choice(list(config["rooms"].keys()))
+            pos = self.random.choice(list(self.gen_map.keys()))
+            x, y = self.random.choice(list(neighbours.keys()))
+            n_x, n_y = pos[0] + x, pos[1] + y
+            doors = neighbours[(x, y)]
+
+            if (
+                room_type in c.ROOM_INFO[
+                    self.gen_map[pos]["type"]
+                ]["dont_connect"]
+            ):
+                continue
+
+            if not (
+                -self.size <= n_x <= self.size and
+                -self.size <= n_y <= self.size
+            ):
+                continue
+
+            if (n_x, n_y) not in self.gen_map.keys():
+                self.gen_map[pos]["doors"][doors[0]] = True
+                self.gen_map[(n_x, n_y)] = {
+                    "type": room_type,
+                    "doors": {i: (i == doors[1]) for i in range(4)}
+                }
+                config["rooms"][room_type] -= 1
+                if config["rooms"][room_type] <= 0:
+                    del config["rooms"][room_type]
+
+        planted = 0
+        while planted < config["connections"]:
+            pos = self.random.choice(list(self.gen_map.keys()))
+            x, y = self.random.choice(list(neighbours.keys()))
+            n_x, n_y = pos[0] + x, pos[1] + y
+            doors = neighbours[(x, y)]
+
+            if (n_x, n_y) in self.gen_map.keys():
+                if (
+                    self.gen_map[pos]["type"] in c.ROOM_INFO[
+                        self.gen_map[(n_x, n_y)]["type"]
+                    ]["dont_connect"] or
+                    self.gen_map[(n_x, n_y)]["type"] in c.ROOM_INFO[
+                        self.gen_map[pos]["type"]
+                    ]["dont_connect"]
+                ):
+                    continue
+
+                self.gen_map[pos]["doors"][doors[0]] = True
+                self.gen_map[(n_x, n_y)]["doors"][doors[1]] = True
+                planted += 1
+
+    def room_seed(self, pos):
+        return f"{self.seed}/{pos[0]}/{pos[1]}"
+
+    def room_arguments(self):
+        """Return the room positions and the `RoomLayout` arguments."""
+        positions = list(self.gen_map.keys())
+        arguments = (
+            [self.gen_map[pos]["type"] for pos in positions],
+            [self.style for pos in positions],
+            [None for pos in positions],
+            [self.gen_map[pos]["doors"] for pos in positions],
+            [self.room_seed(pos) for pos in positions],
+            [self.mode for pos in positions]
+        )
+        return positions, arguments
+
+    def generate_rooms(self, workers=None):
+        """Generate the layout of every room in the map.
+
+        With more than one worker and at least `GENERATION_ROOMS_PER_WORKER`
+        rooms per worker, the rooms are generated in a shared
+        `ProcessPoolExecutor`. A `workers` of None uses `GENERATION_WORKERS`.
+        """
+        positions, arguments = self.room_arguments()
+
+        if workers is None:
+            workers = c.GENERATION_WORKERS
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        if (
+            workers <= 1 or
+            len(positions) < workers * c.GENERATION_ROOMS_PER_WORKER
+        ):
+            layouts = list(map(RoomLayout, *arguments))
+        else:
+            layouts = list(executor(workers).map(
+                RoomLayout,
+                *arguments,
+                chunksize=4
+            ))
+
+        self.rooms = dict(zip(positions, layouts))
+
+
+class RoomLayout:
+    """The generated data of a single room.
+
+    Holds the tilemap, door positions, autotile indices and merged collider
+    rectangles. It is picklable, so it can be generated in another process.
+    """
+
+    def __init__(
+        self,
+        room_type=c.START_ROOM,
+        style=c.HUB, room_config=None, doors=None,
+        seed=None, mode=None
+    ):
+        if mode is None:
+            mode = c.GENERATION_MODE
+        self.type = room_type
+        self.style = style
+        self.doors = doors
+        self.seed = seed
+        rng = random.Random(self.seed)
+        self.tile_seed = rng.getrandbits(32)
+
+        if self.doors is None:
+            self.doors = {i: False for i in range(4)}
+
+        self.door_value = 0
+        for i in range(4):
+            if self.doors[i]:
+                self.door_value += 2**i
+
+        if room_config is None:
+            room_config = rng.choice(
+                c.ROOM_INFO[self.type]["configs"][self.style]
+            )
+
+        self.map_data = rng.choice(room_config["maps"])
+
+        if self.map_data is not None:
+            self.map_data = copy.deepcopy(self.map_data)
+            self.width = self.map_data["width"]
+            self.height = self.map_data["height"]
+        else:
+            self.width = c.ROOM_INFO[self.type]["default_dimensions"][0]
+            self.height = c.ROOM_INFO[self.type]["default_dimensions"][1]
+
+        base = tilemaps.create_blank(
+            self.width,
+            self.height,
+            margin=c.ROOM_BORDER
+        )
+
+        if (
+            self.map_data is not None and
+            self.map_data["matrix"] is not None
+        ):
+            base.update(tilemaps.to_map(self.map_data["matrix"]))
+            for i in range(4):
+                if type(self.map_data["door_info"][i]["pos"]) is tuple:
+                    self.map_data["door_info"][i]["pos"] = rng.randint(
+                        *self.map_data["door_info"][i]["pos"]
+                    )
+
+        self.door_positions = {}
+        for i in range(4):
+            if self.map_data is not None:
+                d_pos = self.map_data["door_info"][i]["pos"]
+            else:
+                d_pos = 0
+            if i == 0:
+                self.door_positions[i] = (d_pos, self.height)
+            elif i == 1:
+                self.door_positions[i] = (self.width, d_pos)
+            elif i == 2:
+                self.door_positions[i] = (d_pos, -self.height)
+            elif i == 3:
+                self.door_positions[i] = (-self.width, d_pos)
+        door_p = list(self.door_positions.values())
+
+        active_doors = [key for key, value in self.doors.items() if value]
+        self.generation_attempts = 0
+        possible = False
+        while not possible:
+            self.generation_attempts += 1
+            self.tilemap = base.copy()
+            self.tilemap = tilemaps.generate(
+                self.type,
+                self.tilemap,
+                room_config["options"],
+                self.map_data,
+                rng=rng
+            )
+            self.tilemap = tilemaps.add_boundaries(
+                self.type,
+                self.tilemap,
+                self.doors,
+                self.map_data
+            )
+
+            if len(active_doors) > 0 and mode == "repair":
+                reached = tilemaps.connect(
+                    self.tilemap,
+                    base,
+                    self.door_positions[active_doors[0]],
+                    door_p
+                )
+                possible = reached is not None
+            elif len(active_doors) > 0:
+                reached = tilemaps.reachable(
+                    self.tilemap,
+                    self.door_positions[active_doors[0]],
+                    door_p
+                )
+                possible = all(pos in reached for pos in door_p)
+            else:
+                possible = True
+
+        self.image_indices = tilemaps.autotile(self.tilemap)
+        self.colliders = tilemaps.colliders(self.tilemap)
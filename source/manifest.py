@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pyglet
+
+from . import constants as c
+
+
+def load(path):
+    """Load an image's pixel data without uploading it.
+
+    PNG decoding is slow in pure Python, so decoded pixels are cached as
+    raw RGBA alongside the tileset manifests.
+    """
+    key = hashlib.sha1(os.path.normpath(path).encode()).hexdigest()
+    cache_path = os.path.join(c.CACHE_PATH, "images", key + ".npz")
+    try:
+        with np.load(cache_path) as cached:
+            if _fresh(path, json.loads(str(cached["record"]))):
+                data = cached["pixels"]
+                return pyglet.image.ImageData(
+                    data.shape[1], data.shape[0], "RGBA", data.tobytes()
+                )
+    except (OSError, KeyError, ValueError):
+        pass
+
+    with pyglet.resource.file(path) as f:
+        image = pyglet.image.load(path, file=f)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path + ".tmp", "wb") as f:
+            np.savez(
+                f,
+                record=np.array(json.dumps(_record(path))),
+                pixels=pixels(image)
+            )
+        os.replace(cache_path + ".tmp", cache_path)
+    except OSError:
+        pass
+    return image
+
+
+def read_tileset(style):
+    """Decode a style's tile sheets and their animation data."""
+    sheets = {}
+    for tile in c.TILES.keys():
+        image = load(f"resources/tilesets/{style}/{tile}.png")
+        try:
+            data_path = f"resources/tilesets/{style}/{tile}.json"
+            with open(data_path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = None
+        sheets[tile] = (image, data)
+    return sheets
+
+
+def pixels(image):
+    """An image's RGBA pixels as an array, bottom row first."""
+    data = image.get_image_data().get_data("RGBA", image.width*4)
+    return np.frombuffer(data, dtype=np.uint8).reshape(
+        image.height, image.width, 4
+    )
+
+
+def _cell(array, index, columns, width, height):
+    """The `index`th cell of a grid, counted like ImageGrid's items."""
+    row, column = divmod(index, columns)
+    return array[
+        row*height:(row+1)*height,
+        column*width:(column+1)*width
+    ]
+
+
+def tileset_sources(style):
+    """The files a style's tileset is built from."""
+    paths = []
+    for tile in c.TILES.keys():
+        paths.append(f"resources/tilesets/{style}/{tile}.png")
+        data_path = f"resources/tilesets/{style}/{tile}.json"
+        if os.path.exists(data_path):
+            paths.append(data_path)
+    return paths
+
+
+def _record(path):
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    return [stat.st_mtime_ns, stat.st_size, digest]
+
+
+def _fresh(path, record):
+    """Whether a file still matches its record.
+
+    Files whose mtime and size match are trusted, others are hashed, so
+    touching a file without changing it does not invalidate a cache.
+    """
+    mtime, size, digest = record
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if stat.st_mtime_ns == mtime and stat.st_size == size:
+        return True
+    return _record(path)[2] == digest
+
+
+def _manifest_config():
+    """Everything besides the source files that the slicing depends on."""
+    return json.loads(json.dumps({
+        "version": c.MANIFEST_VERSION,
+        "page_size": c.TILESET_ATLAS_SIZE,
+        "border": c.ATLAS_BORDER,
+        "dimensions": c.TILESET_DIMENSIONS,
+        "sprites": {tile: c.TILES[tile]["sprite"] for tile in c.TILES}
+    }))
+
+
+def _manifest_fresh(index, style):
+    """Whether a manifest was built from the current sources."""
+    if index["config"] != _manifest_config():
+        return False
+    if set(index["files"]) != set(tileset_sources(style)):
+        return False
+    return all(
+        _fresh(path, record) for path, record in index["files"].items()
+    )
+
+
+def manifest_path(style):
+    return os.path.join(c.CACHE_PATH, f"tileset_{style}.npz")
+
+
+def build_manifest(style):
+    """Slice a style's tile sheets into packed pages and a frame index.
+
+    Identical cells are stored once. The pages and index are written to
+    the cache and returned as `(pages, index)`.
+    """
+    size = c.TILESET_ATLAS_SIZE
+    border = c.ATLAS_BORDER
+    allocators = []
+    pages = []
+    cells = {}
+
+    def pack(cell):
+        key = (cell.shape, cell.tobytes())
+        if key not in cells:
+            height, width = cell.shape[:2]
+            for page, allocator in enumerate(allocators):
+                try:
+                    x, y = allocator.alloc(width+border*2, height+border*2)
+                    break
+                except pyglet.image.atlas.AllocatorException:
+                    pass
+            else:
+                allocators.append(pyglet.image.atlas.Allocator(size, size))
+                pages.append(np.zeros((size, size, 4), dtype=np.uint8))
+                page = len(pages) - 1
+                x, y = allocators[page].alloc(
+                    width+border*2, height+border*2
+                )
+            x += border
+            y += border
+            pages[page][y:y+height, x:x+width] = cell
+            cells[key] = [page, x, y, width, height]
+        return cells[key]
+
+    tiles = {}
+    for tile, (image, data) in read_tileset(style).items():
+        sheet = pixels(image)
+        sprite = c.TILES[tile]["sprite"]
+        if data is None:
+            frames = [sheet]
+            frame_length = None
+            loop = False
+        else:
+            animation = data["animations"][0]
+            frames = [
+                _cell(sheet, i, data["max_length"], *data["frame"])
+                for i in range(animation["length"])
+            ]
+            frame_length = animation["frame_length"]
+            loop = animation["loop"]
+
+        if sprite["connective"]:
+            columns, rows = c.TILESET_DIMENSIONS
+        else:
+            rows = frames[0].shape[0] // sprite["height"]
+            columns = frames[0].shape[1] // sprite["width"]
+        tiles[tile] = {
+            "frame_length": frame_length,
+            "loop": loop,
+            "images": [
+                [
+                    pack(_cell(
+                        frame, i, columns, sprite["width"], sprite["height"]
+                    ))
+                    for frame in frames
+                ]
+                for i in range(rows*columns)
+            ]
+        }
+
+    # Only upload the part of each page that was used
+    pages = [
+        page[:max(strip.y2 for strip in allocator.strips)]
+        for page, allocator in zip(pages, allocators)
+    ]
+    index = {
+        "config": _manifest_config(),
+        "files": {path: _record(path) for path in tileset_sources(style)},
+        "pages": len(pages),
+        "tiles": tiles
+    }
+
+    path = manifest_path(style)
+    try:
+        os.makedirs(c.CACHE_PATH, exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(
+                f,
+                index=np.array(json.dumps(index)),
+                **{f"page{i}": page for i, page in enumerate(pages)}
+            )
+        os.replace(path + ".tmp", path)
+    except OSError:
+        pass
+    return pages, json.loads(json.dumps(index))
+
+
+def read_manifest(style):
+    """A style's packed pages and frame index, rebuilt if out of date."""
+    try:
+        with np.load(manifest_path(style)) as cached:
+            index = json.loads(str(cached["index"]))
+            if _manifest_fresh(index, style):
+                pages = [cached[f"page{i}"] for i in range(index["pages"])]
+                return pages, index
+    except (OSError, KeyError, ValueError):
+        pass
+    return build_manifest(style)
@@ -1,62 +1,238 @@
+import numpy as np
 import pyglet
 
-from .basic import Basic
+from . import cardsprite
+from . import constants as c
 
 
-class Particle(Basic):
-    def __init__(self, application, x, y, image, card_sprite=False):
-        super().__init__(application, x, y, image, card_sprite=card_sprite)
-        self.sprite.group = self.application.layers["world"]["g_particles"]
-        self.application.particles.append(self)
+class ParticlePool(cardsprite.CardSpriteLayer):
+    """Particles sharing a layer and texture.
 
-    def destroy(self):
-        self.sprite.delete()
-        self.application.particles.remove(self)
+    A `CardSpriteLayer` with an age, lifetime, opacity and animation per
+    slot; every live particle is aged, faded and animated in one pass per
+    update.
+    """
 
+    arrays = cardsprite.CardSpriteLayer.arrays + (
+        ('age', (), np.float32, 0),
+        ('lifetime', (), np.float32, np.inf),
+        ('opacity', (), np.float32, 255),
+        ('fade', (), bool, False),
+        ('animation', (), np.int32, -1),
+    )
 
-class TimedParticle(Particle):
-    def __init__(self, application, x, y, image, lifetime, update=1/15, card_sprite=False):  # noqa: E501
-        super().__init__(application, x, y, image, card_sprite=card_sprite)
-        self.lifetime = lifetime
-        self.time = 0
-        pyglet.clock.schedule_interval_soft(self.update, update)
+    def __init__(
+        self, texture, batch, group, card, capacity=c.PARTICLE_CAPACITY
+    ):
+        if not card:
+            self.group_class = pyglet.sprite.SpriteGroup
+        self.card = card
+        self.animations = {}
+        self.animation_frames = []
+        super().__init__(
+            texture,
+            batch=batch,
+            group=group,
+            subpixel=True,
+            capacity=capacity
+        )
 
-    def update(self, dt):
-        self.time += dt
-        if self.time >= self.lifetime:
-            self.destroy()
-            return False
-        return True
+    def add_animation(self, animation):
+        """Index of an animation's frame table, adding it if needed."""
+        if animation not in self.animations:
+            durations = [
+                frame.duration for frame in animation.frames
+                if frame.duration is not None
+            ]
+            tex_coords = np.array([
+                frame.image.get_texture().tex_coords
+                for frame in animation.frames
+            ], dtype=np.float32)
+            self.animations[animation] = len(self.animation_frames)
+            cumulative = np.cumsum(durations or [np.inf])
+            self.animation_frames.append((cumulative, tex_coords))
+        return self.animations[animation]
 
-    def destroy(self):
-        pyglet.clock.unschedule(self.update)
-        super().destroy()
+    def emit(self, x, y, image, lifetime, opacity, fade, flip):
+        if isinstance(image, pyglet.image.Animation):
+            animation = self.add_animation(image)
+            cumulative, _ = self.animation_frames[animation]
+            if lifetime is None:
+                lifetime = cumulative[-1]
+            image = image.frames[0].image
+        else:
+            animation = -1
+        if lifetime is None:
+            lifetime = np.inf
 
+        i = self.add(image, x, y, tilt=1 if self.card else 0)
+        if flip:
+            texture = image.get_texture()
+            self.scale_xy[i, 0] = -1
+            self.position[i, 0] += texture.width - 2*texture.anchor_x
+        self.lifetime[i] = lifetime
+        self.opacity[i] = opacity
+        self.fade[i] = fade
+        self.animation[i] = animation
+        self._colors_dirty = True
 
-class AnimationBasedParticle(Particle):
-    def __init__(self, application, x, y, animation, card_sprite=False):
-        super().__init__(application, x, y, animation, card_sprite=card_sprite)
-        self.sprite.push_handlers(self)
+    def advance(self, dt):
+        """Age every particle, then write the changes to the vertex list."""
+        alive = self.used
+        if alive.any():
+            self.age[alive] += dt
+            for i in np.flatnonzero(alive & (self.age >= self.lifetime)):
+                self.remove(int(i))
 
-    def on_animation_end(self):
-        self.destroy()
+            for index, (cumulative, tex_coords) in enumerate(
+                self.animation_frames
+            ):
+                animated = alive & (self.animation == index)
+                if animated.any():
+                    frame = np.searchsorted(
+                        cumulative, self.age[animated], side="right"
+                    )
+                    frame = np.minimum(frame, len(tex_coords) - 1)
+                    self.tex_coords[animated] = tex_coords[frame]
+                    self._tex_coords_dirty = True
 
+            if (alive & self.fade).any():
+                self._colors_dirty = True
+        self.update()
 
-class Shadow(TimedParticle):
-    def __init__(self, application, x, y, image, lifetime, initial_opacity):
-        super().__init__(
-            application,
-            x, y,
-            image,
-            lifetime,
-            update=1/30,
-            card_sprite=True
+    def _compute_colors(self):
+        opacity = np.where(
+            self.fade,
+            self.opacity * (1 - self.age / np.maximum(self.lifetime, 1e-6)),
+            self.opacity
         )
-        self.sprite.group = self.application.layers["world"]["a_particles"]
-        self.initial_opacity = initial_opacity
-        self.opacity_step = self.initial_opacity/self.lifetime
-        self.sprite.opacity = self.initial_opacity
+        self.colors[:, 3] = np.clip(opacity, 0, 255)
+        return super()._compute_colors()
+
+
+class ParticleSystem:
+    """Every particle in a room, pooled per world layer and texture."""
+
+    def __init__(self, application, batch):
+        self.application = application
+        self.batch = batch
+        self.pools = {}
+
+    def emit(
+        self,
+        layer,
+        x, y,
+        image,
+        lifetime=None,
+        opacity=255,
+        fade=False,
+        flip=False
+    ):
+        """Spawn a particle on a world layer.
+
+        `image` may be an Animation, which plays once; the particle then
+        lives as long as the animation unless `lifetime` is given. With
+        `fade` the opacity falls to zero over the particle's lifetime.
+        """
+        if isinstance(image, pyglet.image.Animation):
+            texture = image.frames[0].image.get_texture()
+        else:
+            texture = image.get_texture()
+
+        key = (layer, texture.id)
+        if key not in self.pools:
+            self.pools[key] = ParticlePool(
+                texture,
+                self.batch,
+                self.application.layers["world"][layer],
+                layer in c.CARD_LAYERS
+            )
+        self.pools[key].emit(x, y, image, lifetime, opacity, fade, flip)
 
     def update(self, dt):
-        if super().update(dt):
-            self.sprite.opacity -= self.opacity_step*dt
+        for pool in self.pools.values():
+            pool.advance(dt)
+
+    def clear(self):
+        for pool in self.pools.values():
+            pool.clear()
+
+    def delete(self):
+        for pool in self.pools.values():
+            pool.delete()
+        self.pools = {}
+
+
+class EmitterRegistry:
+    """Every emitter in a room, timed together from one callback.
+
+    Timers live in arrays and are advanced in a single pass; each time
+    the room is shown a random quarter of the emitters are switched on.
+    Timings and offsets are drawn from `rng`, a NumPy `Generator`.
+    """
+
+    def __init__(
+        self, particles, layer, image, interval=0.5, rng=None,
+        capacity=c.PARTICLE_CAPACITY
+    ):
+        self.particles = particles
+        self.layer = layer
+        self.image = image
+        self.interval = interval
+        if rng is None:
+            rng = np.random.default_rng()
+        self.rng = rng
+        self.count = 0
+        self.positions = np.zeros((capacity, 2), dtype=np.float32)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.last_emit = np.zeros(capacity, dtype=np.float32)
+        self.to_wait = np.zeros(capacity, dtype=np.float32)
+        self.playing = False
+
+    def allocate(self, capacity):
+        def grow(array):
+            grown = np.zeros((capacity,) + array.shape[1:], array.dtype)
+            grown[:len(array)] = array
+            return grown
+
+        self.positions = grow(self.positions)
+        self.active = grow(self.active)
+        self.last_emit = grow(self.last_emit)
+        self.to_wait = grow(self.to_wait)
+
+    def add(self, x, y):
+        if self.count == len(self.positions):
+            self.allocate(max(self.count * 2, 1))
+        self.positions[self.count] = x, y
+        self.active[self.count] = False
+        self.count += 1
+
+    def play(self):
+        count = self.count
+        if self.playing or count == 0:
+            return
+        self.playing = True
+        self.active[:count] = self.rng.integers(0, 4, count) == 0
+        self.last_emit[:count] = 0
+        self.to_wait[:count] = self.rng.integers(2, 17, count) / 2
+        pyglet.clock.schedule_interval_soft(self.update, self.interval)
+
+    def stop(self):
+        self.playing = False
+        pyglet.clock.unschedule(self.update)
+
+    def update(self, dt):
+        active = self.active[:self.count]
+        last_emit = self.last_emit[:self.count]
+        last_emit[active] += dt
+        ready = np.flatnonzero(
+            active & (last_emit >= self.to_wait[:self.count])
+        )
+        if len(ready) == 0:
+            return
+
+        offsets = self.rng.integers((2, 2), (7, 5), (len(ready), 2))
+        for x, y in (self.positions[ready] + offsets).tolist():
+            self.particles.emit(self.layer, x, y, self.image)
+        self.last_emit[ready] = 0
+        self.to_wait[ready] = self.rng.integers(4, 17, len(ready)) / 2
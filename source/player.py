@@ -2,7 +2,6 @@ import pymunk
 from pyglet.window import key, mouse
 
 from . import constants as c
-from . import particle
 from .basic import Basic
 
 
@@ -20,7 +19,8 @@ class Player(Basic):
             collider=c.PLAYER_COLLIDER,
             collision_type=c.COLLISION_TYPES["player"],
             body_type=pymunk.Body.DYNAMIC,
-            space=application.world.map[self.room].space
+            space=application.world.map[self.room].space,
+            batch=application.world.map[self.room].batch
         )
         self.sprite.group = self.application.layers["world"]["y_ordered"]
 
@@ -56,18 +56,31 @@ class Player(Basic):
 
     @room.setter
     def room(self, room):
-        while len(self.application.particles) > 0:
-            self.application.particles[0].destroy()
+        self.application.room.particles.clear()
         self.application.room.visibility = False
         self.application.room.space.remove(self, self.collider)
 
         self._room = room
 
+        self.application.world.enter(self.room)
         self.application.room.visibility = True
+        self.sprite.batch = self.application.room.batch
         self.application.room.space.add(self, self.collider)
         self.application.world.ui_map.discover(self.room)
         self.application.world.ui_map.player_location = self.room
 
+    def leave_world(self):
+        """Take the player out of the world before it is deleted."""
+        self.application.room.particles.clear()
+        self.application.room.space.remove(self, self.collider)
+
+    def enter_world(self):
+        """Place the player in the start room of a new world."""
+        self._room = (0, 0)
+        self.position = (0, 0)
+        self.sprite.batch = self.application.room.batch
+        self.application.room.space.add(self, self.collider)
+
     def update(self, dt):
         controls = {
             "up": (
@@ -113,21 +126,21 @@ class Player(Basic):
             return super().update(dt)
 
         if self.state == "dashing":
+            self.last_shadow += dt
             if self.last_shadow >= self.shadow_frequency:
-                self.last_shadow = 0
+                self.last_shadow -= self.shadow_frequency
                 shadow_image = self.sprite.image.frames[
                     self.sprite._frame_index
                 ].image
-                shadow = particle.Shadow(
-                    self.application,
+                self.application.room.particles.emit(
+                    "a_particles",
                     self.position.x, self.position.y,
                     shadow_image,
-                    0.25,
-                    128
+                    lifetime=0.25,
+                    opacity=128,
+                    fade=True,
+                    flip=self.flip
                 )
-                shadow.flip = self.flip
-            else:
-                self.last_shadow += dt
 
             self.dash_time += dt
             if self.dash_time >= self.dash_length:
@@ -0,0 +1,222 @@
+import collections
+import concurrent.futures
+import functools
+
+import pyglet
+
+from . import constants as c
+from .manifest import load, read_manifest
+
+atlas = pyglet.image.atlas.TextureBin(c.ATLAS_SIZE, c.ATLAS_SIZE)
+
+
+def add(image):
+    """Pack an image into the shared texture atlas."""
+    return atlas.add(image, border=c.ATLAS_BORDER)
+
+
+def image(path):
+    """Load an image into the shared texture atlas."""
+    return add(load(path))
+
+
+def grid(image, rows, columns):
+    """Cut a sheet into cells and pack each one into the atlas.
+
+    Sheets too large for an atlas page (long animation strips) can still
+    share textures with everything else. Cells are keyed by (row, column),
+    with row 0 at the bottom like ImageGrid.
+    """
+    width = image.width // columns
+    height = image.height // rows
+    return {
+        (row, column): add(image.get_region(
+            column*width, row*height, width, height
+        ))
+        for row in range(rows)
+        for column in range(columns)
+    }
+
+
+def placeholder(width, height, color=(0, 0, 0, 255)):
+    """A solid image to stand in for one that is still streaming."""
+    pattern = pyglet.image.SolidColorImagePattern(color)
+    return add(pattern.create_image(width, height))
+
+
+class StreamItem:
+    def __init__(self, future, upload, callback):
+        self.future = future
+        self.upload = upload
+        self.callback = callback
+
+
+class AssetStream:
+    """Decodes assets on a worker thread and uploads them on the main one.
+
+    `update` runs once a frame and uploads at most `uploads` decoded
+    assets, in the order they were submitted, so streaming never holds up
+    a frame for long.
+    """
+
+    def __init__(self, uploads=c.STREAM_UPLOADS):
+        self.uploads = uploads
+        self.decoder = concurrent.futures.ThreadPoolExecutor(1)
+        self.queue = collections.deque()
+
+    def submit(self, decode, upload=None, callback=None):
+        """Run `decode` in the background, then `upload` with its result
+        on the main thread and `callback` with what that returns.
+        """
+        item = StreamItem(self.decoder.submit(decode), upload, callback)
+        self.queue.append(item)
+        return item
+
+    def update(self):
+        for _ in range(self.uploads):
+            if not self.queue or not self.queue[0].future.done():
+                break
+            self.finish(self.queue[0])
+
+    def finish(self, item):
+        """Upload an item now, waiting for it to be decoded if need be."""
+        self.queue.remove(item)
+        result = item.future.result()
+        if item.upload is not None:
+            result = item.upload(result)
+        if item.callback is not None:
+            item.callback(result)
+        return result
+
+
+def create_tileset(pages, index):
+    """Upload a manifest's pages and build its images and animations.
+
+    Returns the tiles, indexed like the sheets they were cut from, and
+    the textures holding them.
+    """
+    textures = [
+        pyglet.image.ImageData(
+            page.shape[1], page.shape[0], "RGBA", page.tobytes()
+        ).get_texture()
+        for page in pages
+    ]
+    tiles = {}
+    for tile, entry in index["tiles"].items():
+        images = []
+        for frames in entry["images"]:
+            regions = [
+                textures[page].get_region(x, y, width, height)
+                for page, x, y, width, height in frames
+            ]
+            if entry["frame_length"] is None:
+                images.append(regions[0])
+            else:
+                images.append(pyglet.image.Animation.from_image_sequence(
+                    regions,
+                    entry["frame_length"],
+                    loop=entry["loop"]
+                ))
+        tiles[int(tile)] = images
+    return tiles, textures
+
+
+class Handle:
+    """A reference to a style's tiles, held until it is released."""
+
+    def __init__(self, manager, style):
+        self.manager = manager
+        self.style = style
+        self.released = False
+
+    @property
+    def tiles(self):
+        return self.manager[self.style]
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.manager.release(self.style)
+
+
+class ResourceManager:
+    """Tilesets by style, shared through reference-counted handles.
+
+    A style is loaded from its cached manifest the first time its tiles
+    are used, or streamed in ahead of time, into textures of its own so
+    they can be dropped as a whole.
+    A style is freed as soon as its last handle is released.  Styles
+    streamed in before anyone holds a handle are kept while they fit in
+    `budget` bytes of texture memory, least recently used dropped first.
+    """
+
+    def __init__(self, budget=c.TILESET_BUDGET, stream=None):
+        self.budget = budget
+        self.stream = stream
+        self.styles = collections.OrderedDict()
+        self.references = collections.Counter()
+        self.pending = {}
+
+    def __getitem__(self, style):
+        if style not in self.styles:
+            self.load(style)
+        self.styles.move_to_end(style)
+        tiles, _ = self.styles[style]
+        return tiles
+
+    def acquire(self, style):
+        """A handle keeping a style loaded until it is released."""
+        self.references[style] += 1
+        return Handle(self, style)
+
+    def release(self, style):
+        self.references[style] -= 1
+        if self.references[style] <= 0:
+            del self.references[style]
+            self.styles.pop(style, None)
+
+    def preload(self, style, callback=None):
+        """Stream a style in, calling `callback` with its tiles once they
+        are uploaded.
+        """
+        if (
+            self.stream is None or
+            style in self.styles or
+            style in self.pending
+        ):
+            return
+        self.pending[style] = self.stream.submit(
+            functools.partial(read_manifest, style),
+            functools.partial(self.add, style),
+            callback
+        )
+
+    def load(self, style):
+        if style in self.pending:
+            self.stream.finish(self.pending[style])
+        else:
+            self.add(style, read_manifest(style))
+
+    def add(self, style, manifest):
+        self.pending.pop(style, None)
+        self.styles[style] = create_tileset(*manifest)
+        self.evict(keep=style)
+        tiles, _ = self.styles[style]
+        return tiles
+
+    def memory(self, style):
+        """Bytes of texture memory held by a loaded style."""
+        _, textures = self.styles[style]
+        return sum(
+            texture.width * texture.height * 4 for texture in textures
+        )
+
+    def evict(self, keep=None):
+        """Free unreferenced styles, least recently used first, until the
+        loaded ones fit in the budget.
+        """
+        for style in list(self.styles.keys()):
+            if sum(map(self.memory, self.styles)) <= self.budget:
+                break
+            if style != keep and style not in self.references:
+                del self.styles[style]
@@ -1,61 +1,65 @@
-import copy
 import random
 
+import numpy as np
+import pyglet
 import pymunk
 
 from . import constants as c
-from . import tilemaps
-from .tile import Tile
+from .animation import Animator
+from .cardsprite import CardSpriteLayer
+from .particle import EmitterRegistry, ParticleSystem
+from .tile import Tile, is_ground, tile_image
 
 
 class Room:
     _visible = False
 
-    def __init__(
-        self,
-        application,
-        room_type=c.START_ROOM,
-        style=None, room_config=None, doors=None
-    ):
+    def __init__(self, application, layout, tileset):
         self.application = application
-        self.type = room_type
-        self.doors = doors
-        self.base = {}
-        self.tilemap = {}
+        self.layout = layout
+        self.tileset = tileset
+        self.type = layout.type
+        self.style = layout.style
+        self.doors = layout.doors
+        self.door_value = layout.door_value
+        self.map_data = layout.map_data
+        self.width = layout.width
+        self.height = layout.height
+        self.tilemap = layout.tilemap
+        self.image_indices = layout.image_indices
+        self.colliders = layout.colliders
         self.tiles = {}
+        self.emitters = None
+        self.animator = Animator()
+        self.particles = None
+        self.chunks = {}
+        self.card_layers = {}
+        self.ground_vertex_lists = []
         self.cleared = self.type == c.START_ROOM
-        self.style = style
-        self.config = room_config
+        self.tile_random = None
+        self.space = None
+        self.batch = None
+        self.built = False
 
+    def build(self):
+        if self.built:
+            return
+        self.batch = pyglet.graphics.Batch()
+        self.particles = ParticleSystem(self.application, self.batch)
+        self.emitters = EmitterRegistry(
+            self.particles,
+            "g_particles",
+            self.application.resources["lava_bubble"],
+            rng=np.random.default_rng(self.layout.tile_seed)
+        )
+        self.create_space()
+        self.create_sprites()
+        self.built = True
+
+    def create_space(self):
         self.space = pymunk.Space(threaded=True)
         self.space.damping = 0
 
-        if self.style is None:
-            self.style = self.application.world.style
-
-        if self.doors is None:
-            self.doors = {i: False for i in range(4)}
-
-        self.door_value = 0
-        for i in range(4):
-            if self.doors[i]:
-                self.door_value += 2**i
-
-        if self.config is None:
-            self.config = random.choice(
-                c.ROOM_INFO[self.type]["configs"][self.style]
-            )
-
-        self.map_data = random.choice(self.config["maps"])
-
-        if self.map_data is not None:
-            self.map_data = copy.deepcopy(self.map_data)
-            self.width = self.map_data["width"]
-            self.height = self.map_data["height"]
-        else:
-            self.width = c.ROOM_INFO[self.type]["default_dimensions"][0]
-            self.height = c.ROOM_INFO[self.type]["default_dimensions"][1]
-
         self.border_colliders = {
             "top": pymunk.Segment(
                 self.space.static_body,
@@ -143,201 +147,152 @@ class Room:
         )
         h.begin = begin
 
-        self.base = tilemaps.create_blank(
-            self.width,
-            self.height
-        )
-
-        if (
-            self.map_data is not None and
-            self.map_data["matrix"] is not None
-        ):
-            self.base.update(tilemaps.to_map(self.map_data["matrix"]))
-            for i in range(4):
-                if type(self.map_data["door_info"][i]["pos"]) is tuple:
-                    self.map_data["door_info"][i]["pos"] = random.randint(
-                        *self.map_data["door_info"][i]["pos"]
-                    )
+        self.create_colliders()
 
-        active_doors = [key for key, value in self.doors.items() if value]
-        possible = False
-        while not possible:
-            self.tilemap = copy.deepcopy(self.base)
-            self.tilemap = tilemaps.generate(
-                self.type,
-                self.tilemap,
-                self.config["options"],
-                self.map_data
+    def create_colliders(self):
+        for tile_type, x, y, width, height in self.colliders:
+            collider = c.TILES[tile_type]["collider"]
+            left = x*c.TILE_SIZE + collider["x"]
+            bottom = y*c.TILE_SIZE + collider["y"]
+            right = (
+                (x+width-1)*c.TILE_SIZE + collider["x"] + collider["width"]
             )
-            self.tilemap = tilemaps.add_boundaries(
-                self.type,
-                self.tilemap,
-                self.doors,
-                self.map_data
+            top = (
+                (y+height-1)*c.TILE_SIZE + collider["y"] + collider["height"]
             )
-
-            if len(active_doors) > 0:
-                starting_door = random.choice(active_doors)
-                door_p = {}
-                for i in range(4):
-                    if self.map_data is not None:
-                        if i == 0:
-                            door_p[i] = (
-                                self.map_data["door_info"][i]["pos"],
-                                self.height
-                            )
-                        elif i == 1:
-                            door_p[i] = (
-                                self.width,
-                                self.map_data["door_info"][i]["pos"]
-                            )
-                        elif i == 2:
-                            door_p[i] = (
-                                self.map_data["door_info"][i]["pos"],
-                                -self.height
-                            )
-                        elif i == 3:
-                            door_p[i] = (
-                                -self.width,
-                                self.map_data["door_info"][i]["pos"]
-                            )
-                    else:
-                        if i == 0:
-                            door_p[i] = (
-                                0,
-                                self.height
-                            )
-                        elif i == 1:
-                            door_p[i] = (
-                                self.width,
-                                0
-                            )
-                        elif i == 2:
-                            door_p[i] = (
-                                0,
-                                -self.height
-                            )
-                        elif i == 3:
-                            door_p[i] = (
-                                -self.width,
-                                0
-                            )
-
-                neighbours = [
-                    (0, 1),
-                    (1, 0),
-                    (0, -1),
-                    (-1, 0)
-                ]
-                self.reached = [door_p[starting_door]]
-                reachable = []
-                for x, y in neighbours:
-                    n_x = x+door_p[starting_door][0]
-                    n_y = y+door_p[starting_door][1]
-                    if (
-                        (n_x, n_y) in self.tilemap.keys() and
-                        (n_x, n_y) not in reachable and
-                        (n_x, n_y) not in self.reached and
-                        c.TILES[self.tilemap[
-                            (n_x, n_y)
-                        ]]["collider"] is None
-                    ):
-                        reachable.append((n_x, n_y))
-
-                while len(reachable) > 0:
-                    pos = random.choice(reachable)
-                    self.reached.append(pos)
-                    reachable.remove(pos)
-
-                    for x, y in neighbours:
-                        n_x = x+pos[0]
-                        n_y = y+pos[1]
-                        if (
-                            (n_x, n_y) in self.tilemap.keys() and
-                            (n_x, n_y) not in reachable and
-                            (n_x, n_y) not in self.reached and
-                            c.TILES[self.tilemap[
-                                (n_x, n_y)
-                            ]]["collider"] is None
-                        ):
-                            reachable.append((n_x, n_y))
-
-                possible = True
-                for x, y in door_p.values():
-                    if (x, y) not in self.reached:
-                        possible = False
-            else:
-                possible = True
+            shape = pymunk.Poly(
+                self.space.static_body,
+                [(left, bottom), (right, bottom), (right, top), (left, top)],
+                radius=collider["radius"]
+            )
+            shape.collision_type = c.COLLISION_TYPES["tile"]
+            self.space.add(shape)
 
     def create_sprites(self):
-        for x in range(-(self.width+3), self.width+4):
-            for y in range(-(self.height+3), self.height+4):
-                if (x, y) in self.tilemap.keys():
-                    tile = Tile(
-                        self.application,
-                        self,
-                        x, y
-                    )
-                    self.tiles[(x, y)] = tile
-
-    def get_image_index(self, x, y):
-        tilemap = self.tilemap
-        tileID = tilemap[(x, y)]
-        value = 0
-
-        sides = {
-            128: False, 1: False,   2: False,
-            64: False,              4: False,
-            32: False,  16: False,  8: False
-        }
-
-        connects = c.TILES[tileID]["sprite"]["connects"]
-
-        if (x, y+1) in tilemap.keys() and tilemap[(x, y+1)] not in connects:
-            sides.update({128: True, 1: True, 2: True})
-        if (x+1, y) in tilemap.keys() and tilemap[(x+1, y)] not in connects:
-            sides.update({2: True, 4: True, 8: True})
-        if (x, y-1) in tilemap.keys() and tilemap[(x, y-1)] not in connects:
-            sides.update({8: True, 16: True, 32: True})
-        if (x-1, y) in tilemap.keys() and tilemap[(x-1, y)] not in connects:
-            sides.update({32: True, 64: True, 128: True})
-
-        if (
-            (x+1, y+1) in tilemap.keys() and
-            tilemap[(x+1, y+1)] not in connects
-        ):
-            sides[2] = True
-        if (
-            (x+1, y-1) in tilemap.keys() and
-            tilemap[(x+1, y-1)] not in connects
-        ):
-            sides[8] = True
-        if (
-            (x-1, y-1) in tilemap.keys() and
-            tilemap[(x-1, y-1)] not in connects
-        ):
-            sides[32] = True
-        if (
-            (x-1, y+1) in tilemap.keys() and
-            tilemap[(x-1, y+1)] not in connects
-        ):
-            sides[128] = True
-
-        for side in sides.keys():
-            if sides[side]:
-                value += side
+        self.tile_random = random.Random(self.layout.tile_seed)
+        ground = []
+        for x, y in self.tilemap.keys():
+            if self.tilemap[(x, y)] == c.PIT and self.style == c.VOLCANO:
+                self.emitters.add(x*c.TILE_SIZE, y*c.TILE_SIZE)
+            image = tile_image(self, x, y)
+            if is_ground(self.tilemap[(x, y)]):
+                ground.append((x, y, image))
+                continue
+            tile = Tile(
+                self.application,
+                self,
+                x, y,
+                image
+            )
+            self.tiles[(x, y)] = tile
+        self.bake_ground(ground)
+
+    def chunk_group(self, x, y, layer):
+        """The group drawing `layer` for the chunk holding tile (x, y)."""
+        chunk = (x // c.CHUNK_SIZE, y // c.CHUNK_SIZE)
+        if chunk not in self.chunks:
+            self.chunks[chunk] = {}
+        groups = self.chunks[chunk]
+        if layer not in groups:
+            groups[layer] = pyglet.graphics.Group(
+                self.application.layers["world"][layer]
+            )
+        return groups[layer]
+
+    def card_layer(self, x, y, layer, image):
+        """The sprite layer for `image`'s texture in a chunk's `layer`."""
+        texture = image.get_texture()
+        group = self.chunk_group(x, y, layer)
+        key = (texture.id, group)
+        if key not in self.card_layers:
+            self.card_layers[key] = CardSpriteLayer(
+                texture,
+                batch=self.batch,
+                group=group,
+                subpixel=True,
+                capacity=0
+            )
+        return self.card_layers[key]
+
+    def update_sprites(self):
+        """Write changed card sprites to their vertex lists."""
+        for layer in self.card_layers.values():
+            layer.update()
+
+    def cull(self, left, bottom, right, top):
+        """Only draw the chunks overlapping a rectangle of the world."""
+        size = c.CHUNK_SIZE * c.TILE_SIZE
+        # Walls and other tall sprites overhang their chunk by up to a tile
+        left -= c.TILE_SIZE
+        bottom -= c.TILE_SIZE
+        for (x, y), groups in self.chunks.items():
+            visible = (
+                x*size < right and (x+1)*size > left and
+                y*size < top and (y+1)*size > bottom
+            )
+            for group in groups.values():
+                if group.visible != visible:
+                    group.visible = visible
+
+    def bake_ground(self, ground):
+        """Merge ground tiles into a vertex list per texture and chunk.
+
+        Animated tiles get lists of their own per frame timing, whose
+        texture coordinates the room's animator rewrites each frame.
+        """
+        self.delete_ground()
+        textures = {}
+        for x, y, image in ground:
+            animation = None
+            durations = None
+            if isinstance(image, pyglet.image.Animation):
+                animation = image
+                image = animation.frames[0].image
+                durations = tuple(
+                    frame.duration for frame in animation.frames
+                )
+            texture = image.get_texture()
+            group = self.chunk_group(x, y, "ground")
+            key = (texture.id, group, durations)
+            if key not in textures:
+                textures[key] = (texture, group, [], [], [])
+            _, _, vertices, tex_coords, animations = textures[key]
+            left = x*c.TILE_SIZE - image.anchor_x
+            bottom = y*c.TILE_SIZE - image.anchor_y
+            right = left + image.width
+            top = bottom + image.height
+            vertices.extend((
+                left, bottom, right, bottom, right, top, left, top
+            ))
+            tex_coords.extend(texture.tex_coords)
+            animations.append(animation)
+
+        for (_, _, durations), (
+            texture, chunk, vertices, tex_coords, animations
+        ) in textures.items():
+            group = pyglet.sprite.SpriteGroup(
+                texture,
+                pyglet.gl.GL_SRC_ALPHA,
+                pyglet.gl.GL_ONE_MINUS_SRC_ALPHA,
+                chunk
+            )
+            usage = "static" if durations is None else "dynamic"
+            vertex_list = self.batch.add(
+                len(vertices)//2, pyglet.gl.GL_QUADS, group,
+                ("v2f/static", vertices),
+                (f"t3f/{usage}", tex_coords)
+            )
+            self.ground_vertex_lists.append(vertex_list)
+            if durations is not None:
+                self.animator.add_vertex_list(vertex_list, animations)
 
-        index_dict = {
-            34: 2, 136: 3, 226: 4, 184: 5, 58: 6, 142: 7, 138: 8, 162: 9,
-            251: 10, 187: 11, 191: 12, 255: 13, 139: 14, 46: 15, 232: 16,
-            163: 17, 42: 18, 168: 19, 248: 20, 56: 21, 62: 22, 254: 23,
-            250: 24, 186: 25, 190: 26, 2: 27, 130: 28, 128: 29, 224: 30, 0: 31,
-            14: 32, 238: 33, 234: 34, 174: 36, 10: 37, 170: 38, 160: 39,
-            227: 40, 131: 41, 143: 42, 239: 43, 235: 44, 171: 45, 175: 46,
-            8: 47, 40: 48, 32: 49
-        }
+    def delete_ground(self):
+        for vertex_list in self.ground_vertex_lists:
+            vertex_list.delete()
+        self.ground_vertex_lists = []
 
-        return index_dict[value]
+    def get_image_index(self, x, y):
+        return self.image_indices[(x, y)]
 
     @property
     def visibility(self):
@@ -349,21 +304,35 @@ class Room:
         if self.visibility == visible:
             return
 
-        for pos in self.tiles.keys():
-            tile = self.tiles[pos]
-            if not tile.loaded and visible:
-                tile.load()
-            elif tile.loaded and not visible:
-                tile.unload()
+        if visible:
+            self.animator.play()
+            self.emitters.play()
+        else:
+            self.animator.stop()
+            self.emitters.stop()
         self._visible = visible
 
     def delete(self):
+        if not self.built:
+            return
         self.space.remove(
             *self.space.bodies,
             *self.space.shapes
         )
-        del self.space
+        self.space = None
+        self.animator.clear()
+        self.emitters.stop()
+        self.emitters = None
         for pos in self.tiles.keys():
-            self.tiles[pos].unload()
             self.tiles[pos].sprite.delete()
-        del self.tiles
+        self.tiles = {}
+        for layer in self.card_layers.values():
+            layer.delete()
+        self.card_layers = {}
+        self.delete_ground()
+        self.chunks = {}
+        self.particles.delete()
+        self.particles = None
+        self.batch = None
+        self._visible = False
+        self.built = False
@@ -1,98 +1,50 @@
-import random
 
 import pyglet
 
 from . import constants as c
-from . import particle
-from .basic import Basic
 
 
-class Tile(Basic):
+def tile_image(room, x, y):
+    """Pick the image for the tile at (x, y) in a room."""
+    tile_type = room.tilemap[(x, y)]
+    images = room.tileset.tiles[tile_type]
+    if not c.TILES[tile_type]["sprite"]["connective"]:
+        return room.tile_random.choice(images)
+    return images[room.get_image_index(x, y)]
 
-    def __init__(self, application, room, x, y):
-        self.room = room
-        self.type = self.room.tilemap[(x, y)]
-
-        if not c.TILES[self.type]["sprite"]["connective"]:
-            image = random.choice(
-                application.resources[
-                    "tiles"
-                ][
-                    self.room.style
-                ][
-                    self.type
-                ]
-            )
-        else:
-            index = self.room.get_image_index(x, y)
-            image = application.resources[
-                "tiles"
-            ][
-                self.room.style
-            ][
-                self.type
-            ][
-                index
-            ]
-
-        collider = None
-        for n_x in range(-1, 2):
-            for n_y in range(-1, 2):
-                if (
-                    (x+n_x, y+n_y) in self.room.tilemap.keys() and
-                    c.TILES[
-                        self.room.tilemap[(x+n_x, y+n_y)]
-                    ]["collider"] is None
-                ):
-                    collider = c.TILES[self.type]["collider"]
 
-        super().__init__(
-            application,
-            x*c.TILE_SIZE, y*c.TILE_SIZE,
-            image,
-            card_sprite=self.type == c.WALL,
-            collider=collider,
-            collision_type=c.COLLISION_TYPES["tile"],
-            space=self.room.space
-        )
-        layer = self.application.layers["world"][c.TILES[self.type]["layer"]]
-        self.sprite.group = layer
-        self.unload()
+def is_ground(tile_type):
+    """Whether a tile is baked into its room's ground layer."""
+    return c.TILES[tile_type]["layer"] == "ground"
 
-    def load(self):
-        self.loaded = True
-        self.sprite.visible = True
-        try:
-            self.sprite._animate(0)
-        except AttributeError:
-            pass
 
-        r = random.randint(0, 3)
-        if (
-            self.type == c.PIT and
-            self.room.style == c.VOLCANO and
-            r == 0
-        ):
-            pyglet.clock.schedule_interval_soft(self.emitter, 0.5)
-            self.last_bubble = 0
-            self.to_wait = random.randint(2, 16)/2
+class Tile:
+    """The sprite of one tile; collisions come from the room's colliders."""
 
-    def unload(self):
-        self.loaded = False
-        self.sprite.visible = False
-        pyglet.clock.unschedule(self.sprite._animate)
-        pyglet.clock.unschedule(self.emitter)
+    def __init__(self, application, room, x, y, image=None):
+        self.application = application
+        self.room = room
+        self.type = self.room.tilemap[(x, y)]
 
-    def emitter(self, dt):
-        if self.sprite.visible:
-            self.last_bubble += dt
-            if self.last_bubble >= self.to_wait:
-                x = self.position.x+random.randint(2, 6)
-                y = self.position.y+random.randint(2, 4)
-                particle.AnimationBasedParticle(
-                    self.application,
-                    x, y,
-                    self.application.resources["lava_bubble"]
-                )
-                self.last_bubble = 0
-                self.to_wait = random.randint(4, 16)/2
+        if image is None:
+            image = tile_image(room, x, y)
+
+        layer = c.TILES[self.type]["layer"]
+        if self.type == c.WALL:
+            animation = None
+            if isinstance(image, pyglet.image.Animation):
+                animation = image
+                image = animation.frames[0].image
+            self.sprite = self.room.card_layer(x, y, layer, image).add_sprite(
+                image, x*c.TILE_SIZE, y*c.TILE_SIZE
+            )
+            if animation is not None:
+                self.room.animator.add_sprite(animation, self.sprite)
+        else:
+            self.sprite = pyglet.sprite.Sprite(
+                image,
+                x=x*c.TILE_SIZE, y=y*c.TILE_SIZE,
+                batch=self.room.batch,
+                group=self.room.chunk_group(x, y, layer),
+                subpixel=True
+            )
@@ -1,17 +1,150 @@
-import copy
 import random
+from collections import deque
+
+import numpy as np
 
 from . import constants as c
 
+# Tile Properties
+WALKABLE = [
+    tile_type for tile_type, data in c.TILES.items() if
+    data["collider"] is None
+]
+
+# Autotiling
+NEIGHBOUR_SIDES = {
+    (0, 1): 128 | 1 | 2,
+    (1, 0): 2 | 4 | 8,
+    (0, -1): 8 | 16 | 32,
+    (-1, 0): 32 | 64 | 128,
+    (1, 1): 2,
+    (1, -1): 8,
+    (-1, -1): 32,
+    (-1, 1): 128
+}
+IMAGE_INDICES = {
+    34: 2, 136: 3, 226: 4, 184: 5, 58: 6, 142: 7, 138: 8, 162: 9,
+    251: 10, 187: 11, 191: 12, 255: 13, 139: 14, 46: 15, 232: 16,
+    163: 17, 42: 18, 168: 19, 248: 20, 56: 21, 62: 22, 254: 23,
+    250: 24, 186: 25, 190: 26, 2: 27, 130: 28, 128: 29, 224: 30, 0: 31,
+    14: 32, 238: 33, 234: 34, 174: 36, 10: 37, 170: 38, 160: 39,
+    227: 40, 131: 41, 143: 42, 239: 43, 235: 44, 171: 45, 175: 46,
+    8: 47, 40: 48, 32: 49
+}
+INDEX_TABLE = np.full(256, c.VOID, dtype=np.int8)
+for value, index in IMAGE_INDICES.items():
+    INDEX_TABLE[value] = index
+
+
+class TileGrid:
+    """A tilemap stored as a contiguous array of tile IDs.
+
+    Cells are addressed with ``(x, y)`` tuples from ``-width`` to ``width``
+    and ``-height`` to ``height``, and behave like the keys of a dict: cells
+    holding ``c.VOID`` are treated as missing. The array itself is indexed
+    ``[x+width, y+height]``.
+    """
+
+    def __init__(self, width, height, fill=c.VOID):
+        self.width = width
+        self.height = height
+        self.array = np.full(
+            (width*2+1, height*2+1),
+            fill,
+            dtype=np.int8
+        )
+
+    def _index(self, pos):
+        x, y = pos
+        i = x + self.width
+        j = y + self.height
+        if 0 <= i < self.array.shape[0] and 0 <= j < self.array.shape[1]:
+            return i, j
+        return None
+
+    def __getitem__(self, pos):
+        index = self._index(pos)
+        if index is not None:
+            value = int(self.array[index])
+            if value != c.VOID:
+                return value
+        raise KeyError(pos)
+
+    def __setitem__(self, pos, value):
+        index = self._index(pos)
+        if index is None:
+            raise KeyError(pos)
+        self.array[index] = value
+
+    def __contains__(self, pos):
+        index = self._index(pos)
+        return index is not None and self.array[index] != c.VOID
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return int(np.count_nonzero(self.array != c.VOID))
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def get(self, pos, default=None):
+        try:
+            return self[pos]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self.positions(self.array != c.VOID)
+
+    def values(self):
+        return [self[pos] for pos in self.keys()]
+
+    def items(self):
+        return [(pos, self[pos]) for pos in self.keys()]
+
+    def positions(self, mask):
+        """Return the ``(x, y)`` positions of every cell set in ``mask``."""
+        return [
+            (int(i)-self.width, int(j)-self.height)
+            for i, j in np.argwhere(mask)
+        ]
+
+    def of_type(self, tile_types):
+        """Return the positions of every cell holding one of ``tile_types``."""
+        return self.positions(np.isin(self.array, tile_types))
+
+    def update(self, other):
+        """Copy every non-void cell of ``other`` into this grid."""
+        if isinstance(other, TileGrid):
+            x = self.width - other.width
+            y = self.height - other.height
+            region = self.array[
+                x:x+other.array.shape[0],
+                y:y+other.array.shape[1]
+            ]
+            np.copyto(region, other.array, where=other.array != c.VOID)
+        else:
+            for pos, value in other.items():
+                self[pos] = value
+
+    def copy(self):
+        grid = TileGrid.__new__(TileGrid)
+        grid.width = self.width
+        grid.height = self.height
+        grid.array = self.array.copy()
+        return grid
+
 
 def to_map(matrix):
     height = len(matrix)//2
     width = len(matrix[0])//2
-    tilemap = {}
-    for y in range(len(matrix)):
-        for x in range(len(matrix[y])):
-            if matrix[y][x] != c.VOID:
-                tilemap[(-width+x, height-y)] = matrix[y][x]
+    tilemap = TileGrid(width, height)
+    tilemap.array[:, :] = np.array(matrix, dtype=np.int8).T[:, ::-1]
     return tilemap
 
 
@@ -108,15 +241,11 @@ def add_boundaries(room_type, room_map, doors_enabled, map_data):
     }
 
     for x in range(-(width+1), width+2):
-        room_map.update({
-            (x, height+1): border_type,
-            (x, -(height+1)): border_type
-        })
+        room_map[(x, height+1)] = border_type
+        room_map[(x, -(height+1))] = border_type
     for y in range(-(height+1), height+2):
-        room_map.update({
-            (width+1, y): border_type,
-            (-(width+1), y): border_type
-        })
+        room_map[(width+1, y)] = border_type
+        room_map[(-(width+1), y)] = border_type
 
     for i in range(4):
         if doors_enabled[i]:
@@ -125,16 +254,17 @@ def add_boundaries(room_type, room_map, doors_enabled, map_data):
     return room_map
 
 
-def create_blank(width=7, height=7, tile_type=c.FLOOR):
-    map = {}
-    for x in range(-width, width+1):
-        for y in range(-height, height+1):
-            map[(x, y)] = tile_type
+def create_blank(width=7, height=7, tile_type=c.FLOOR, margin=0):
+    map = TileGrid(width+margin, height+margin)
+    map.array[
+        margin:margin+width*2+1,
+        margin:margin+height*2+1
+    ] = tile_type
     return map
 
 
-def generate(room_type, room_map, tile_options, map_data):
-    pre_generation = copy.deepcopy(room_map)
+def generate(room_type, room_map, tile_options, map_data, rng=random):
+    pre_generation = room_map.copy()
 
     if map_data is not None:
         width = map_data["width"]
@@ -144,12 +274,9 @@ def generate(room_type, room_map, tile_options, map_data):
 
     def blob(options):
         seeded = 0
-        possible_seeds = [
-            pos for pos in room_map.keys() if
-            room_map[pos] in options["overrides"]
-        ]
+        possible_seeds = room_map.of_type(options["overrides"])
         while seeded < options["seed_amount"] and len(possible_seeds) > 0:
-            seed = random.choice(possible_seeds)
+            seed = rng.choice(possible_seeds)
             room_map[seed] = options["id"]
             neighbours = [
                 (1, 0),
@@ -159,12 +286,12 @@ def generate(room_type, room_map, tile_options, map_data):
             ]
             possible = []
             spread = 0
-            additional_chance = random.random() * 100
+            additional_chance = rng.random() * 100
 
             for x, y in neighbours:
                 n_x, n_y = seed[0]+x, seed[1]+y
                 if (
-                    (n_x, n_y) in room_map.keys() and
+                    (n_x, n_y) in room_map and
                     room_map[(n_x, n_y)] in options["overrides"]
                 ):
                     possible.append((n_x, n_y))
@@ -176,7 +303,7 @@ def generate(room_type, room_map, tile_options, map_data):
                 ) and
                 len(possible) > 0
             ):
-                next_pos = random.choice(possible)
+                next_pos = rng.choice(possible)
                 room_map[next_pos] = options["id"]
 
                 while next_pos in possible:
@@ -185,7 +312,7 @@ def generate(room_type, room_map, tile_options, map_data):
                 for x, y in neighbours:
                     n_x, n_y = next_pos[0]+x, next_pos[1]+y
                     if (
-                        (n_x, n_y) in room_map.keys() and
+                        (n_x, n_y) in room_map and
                         room_map[(n_x, n_y)] in options["overrides"] and
                         (
                             (n_x, n_y) not in possible or
@@ -195,12 +322,9 @@ def generate(room_type, room_map, tile_options, map_data):
                         possible.append((n_x, n_y))
 
                 spread += 1
-                additional_chance = random.random() * 100
+                additional_chance = rng.random() * 100
 
-            possible_seeds = [
-                pos for pos in room_map.keys() if
-                room_map[pos] in options["overrides"]
-            ]
+            possible_seeds = room_map.of_type(options["overrides"])
             seeded += 1
 
     def line(options):
@@ -216,17 +340,17 @@ def generate(room_type, room_map, tile_options, map_data):
             seeded < options["seed_amount"] and
             tries < 50
         ):
-            old_map = copy.deepcopy(room_map)
+            old_map = room_map.copy()
 
-            horizontal = random.choice([True, False])
+            horizontal = rng.choice([True, False])
             if horizontal:
-                l_pos = random.randint(-(height-2), (height-2))
+                l_pos = rng.randint(-(height-2), (height-2))
                 line = [
                     (x, l_pos) for x in range(-width, width+1) if
                     room_map[(x, l_pos)] in options["overrides"]
                 ]
             else:
-                l_pos = random.randint(-(width-2), (width-2))
+                l_pos = rng.randint(-(width-2), (width-2))
                 line = [
                     (l_pos, y) for y in range(-height, height+1) if
                     room_map[(l_pos, y)] in options["overrides"]
@@ -256,9 +380,9 @@ def generate(room_type, room_map, tile_options, map_data):
 
                 for i in range(options["l_hole_amount"]):
                     hole_possible = []
-                    hole_size = random.randint(*options["l_hole_size_range"])
+                    hole_size = rng.randint(*options["l_hole_size_range"])
                     if horizontal:
-                        hole_pos = random.randint(-width, width)
+                        hole_pos = rng.randint(-width, width)
                         room_map[
                             (hole_pos, l_pos)
                         ] = old_map[(hole_pos, l_pos)]
@@ -267,7 +391,7 @@ def generate(room_type, room_map, tile_options, map_data):
                             (-1, 0)
                         ]
                     else:
-                        hole_pos = random.randint(-height, height)
+                        hole_pos = rng.randint(-height, height)
                         room_map[
                             (l_pos, hole_pos)
                         ] = old_map[(l_pos, hole_pos)]
@@ -282,21 +406,21 @@ def generate(room_type, room_map, tile_options, map_data):
                         else:
                             n_x, n_y = l_pos + x, hole_pos + y
                         if (
-                            (n_x, n_y) in room_map.keys() and
+                            (n_x, n_y) in room_map and
                             (n_x, n_y) not in hole_possible
                         ):
                             hole_possible.append((n_x, n_y))
 
                     hole = 1
                     while hole < hole_size:
-                        next_pos = random.choice(hole_possible)
+                        next_pos = rng.choice(hole_possible)
                         room_map[next_pos] = old_map[next_pos]
                         hole_possible.remove(next_pos)
 
                         for x, y in neighbours:
                             n_x, n_y = next_pos[0] + x, next_pos[1] + y
                             if (
-                                (n_x, n_y) in room_map.keys() and
+                                (n_x, n_y) in room_map and
                                 (n_x, n_y) not in hole_possible
                             ):
                                 hole_possible.append((n_x, n_y))
@@ -335,3 +459,197 @@ def generate(room_type, room_map, tile_options, map_data):
                 room_map[pos] = pre_generation[pos]
 
     return room_map
+
+
+def image_index(tilemap, x, y):
+    """Return the image index of the connective tile at ``(x, y)``."""
+    connects = c.TILES[tilemap[(x, y)]]["sprite"]["connects"]
+    value = 0
+    for (n_x, n_y), sides in NEIGHBOUR_SIDES.items():
+        neighbour = tilemap.get((x+n_x, y+n_y))
+        if neighbour is not None and neighbour not in connects:
+            value |= sides
+    return IMAGE_INDICES[value]
+
+
+def autotile(tilemap):
+    """Return the image index of every connective tile in ``tilemap``.
+
+    The neighbour mask of each connective tile type is built with one
+    shifted comparison per neighbour over the whole grid, then mapped
+    through ``INDEX_TABLE``. Non-connective cells are left ``c.VOID``.
+    """
+    indices = TileGrid(tilemap.width, tilemap.height)
+    columns, rows = tilemap.array.shape
+    padded = np.pad(tilemap.array, 1, constant_values=c.VOID)
+    for tile_type, data in c.TILES.items():
+        if not data["sprite"]["connective"]:
+            continue
+        tiles = tilemap.array == tile_type
+        if not tiles.any():
+            continue
+
+        breaks = (
+            (padded != c.VOID) &
+            ~np.isin(padded, data["sprite"]["connects"])
+        )
+        values = np.zeros(tilemap.array.shape, dtype=np.uint8)
+        for (x, y), sides in NEIGHBOUR_SIDES.items():
+            values[breaks[1+x:1+x+columns, 1+y:1+y+rows]] |= sides
+        indices.array[tiles] = INDEX_TABLE[values[tiles]]
+    return indices
+
+
+def reachable(tilemap, start, targets=None):
+    """Flood fill the walkable cells connected to ``start``.
+
+    Returns the set of reached positions. If ``targets`` is given the fill
+    stops as soon as every position in it has been reached.
+    """
+    walkable = np.isin(tilemap.array, WALKABLE).tolist()
+    columns, rows = tilemap.array.shape
+    reached = {start}
+    if targets is not None:
+        remaining = set(targets) - reached
+    queue = deque([start])
+    while len(queue) > 0 and (targets is None or len(remaining) > 0):
+        x, y = queue.popleft()
+        for n_x, n_y in ((x, y+1), (x+1, y), (x, y-1), (x-1, y)):
+            i = n_x + tilemap.width
+            j = n_y + tilemap.height
+            if (
+                0 <= i < columns and 0 <= j < rows and
+                walkable[i][j] and
+                (n_x, n_y) not in reached
+            ):
+                reached.add((n_x, n_y))
+                queue.append((n_x, n_y))
+                if targets is not None:
+                    remaining.discard((n_x, n_y))
+    return reached
+
+
+def connect(tilemap, base, start, targets):
+    """Carve paths from ``start`` to every position in ``targets``.
+
+    Each unreached target is joined to the area reachable from ``start``
+    along the path that crosses the fewest generated walls and pits, which
+    are reverted to the tile underneath them in ``base``. Tiles that are
+    solid in ``base`` are never carved.
+
+    Returns the set of reached positions, or None if a target can't be
+    connected.
+    """
+    reached = reachable(tilemap, start, targets)
+    walkable = np.isin(tilemap.array, WALKABLE).tolist()
+    carvable = np.isin(base.array, WALKABLE).tolist()
+    columns, rows = tilemap.array.shape
+
+    for target in targets:
+        if target in reached:
+            continue
+
+        parents = {target: None}
+        costs = {target: 0}
+        queue = deque([target])
+        found = None
+        while len(queue) > 0:
+            pos = queue.popleft()
+            if pos in reached:
+                found = pos
+                break
+            x, y = pos
+            for n_x, n_y in ((x, y+1), (x+1, y), (x, y-1), (x-1, y)):
+                i = n_x + tilemap.width
+                j = n_y + tilemap.height
+                if not (0 <= i < columns and 0 <= j < rows):
+                    continue
+                if walkable[i][j]:
+                    cost = costs[pos]
+                elif carvable[i][j]:
+                    cost = costs[pos] + 1
+                else:
+                    continue
+                if cost < costs.get((n_x, n_y), cost+1):
+                    costs[(n_x, n_y)] = cost
+                    parents[(n_x, n_y)] = pos
+                    if cost == costs[pos]:
+                        queue.appendleft((n_x, n_y))
+                    else:
+                        queue.append((n_x, n_y))
+
+        if found is None:
+            return None
+
+        pos = found
+        while pos is not None:
+            i = pos[0] + tilemap.width
+            j = pos[1] + tilemap.height
+            if not walkable[i][j]:
+                tilemap[pos] = base[pos]
+                walkable[i][j] = True
+            pos = parents[pos]
+        reached = reachable(tilemap, start, targets)
+
+    return reached
+
+
+def exposed(tilemap):
+    """Return a mask of the solid tiles touching a walkable tile.
+
+    These are the only tiles that can be collided with, so they are the
+    only ones that need a collider.
+    """
+    solid = (tilemap.array != c.VOID) & ~np.isin(tilemap.array, WALKABLE)
+    walkable = np.pad(np.isin(tilemap.array, WALKABLE), 1)
+    columns, rows = tilemap.array.shape
+    touching = np.zeros(tilemap.array.shape, dtype=bool)
+    for x in range(3):
+        for y in range(3):
+            touching |= walkable[x:x+columns, y:y+rows]
+    return solid & touching
+
+
+def rectangles(mask):
+    """Greedily split a boolean mask into maximal rectangles.
+
+    Returns a list of ``(i, j, width, height)`` in array indices.
+    """
+    remaining = mask.copy()
+    columns, rows = mask.shape
+    result = []
+    for j, i in np.argwhere(mask.T).tolist():
+        if not remaining[i, j]:
+            continue
+        width = 1
+        while i+width < columns and remaining[i+width, j]:
+            width += 1
+        height = 1
+        while j+height < rows and remaining[i:i+width, j+height].all():
+            height += 1
+        remaining[i:i+width, j:j+height] = False
+        result.append((i, j, width, height))
+    return result
+
+
+def colliders(tilemap):
+    """Return merged collider rectangles for the solid tiles of a map.
+
+    The tiles of each solid type are merged into rectangles, and any
+    rectangle without an exposed tile in it is dropped. Each is returned as
+    ``(tile_type, x, y, width, height)`` in tile coordinates.
+    """
+    touching = exposed(tilemap)
+    result = []
+    for tile_type, data in c.TILES.items():
+        if data["collider"] is None:
+            continue
+        mask = tilemap.array == tile_type
+        for i, j, width, height in rectangles(mask):
+            if touching[i:i+width, j:j+height].any():
+                result.append((
+                    tile_type,
+                    i-tilemap.width, j-tilemap.height,
+                    width, height
+                ))
+    return result
@@ -1,5 +1,15 @@
-from . import (map, transition)
+import importlib
 
 submodules = [
-    map, transition
+    "map", "transition"
 ]
+
+
+def __getattr__(name):
+    if name in submodules:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + submodules)
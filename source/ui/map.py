@@ -1,10 +1,32 @@
-
+import numpy as np
 import pyglet
 
 from .. import constants as c
+from .. import manifest
+
+
+def _over(top, bottom):
+    """Blend one RGBA image over another."""
+    top = top / 255
+    bottom = bottom / 255
+    top_alpha = top[:, :, 3:]
+    bottom_alpha = bottom[:, :, 3:] * (1-top_alpha)
+    alpha = top_alpha + bottom_alpha
+    rgb = (
+        top[:, :, :3]*top_alpha + bottom[:, :, :3]*bottom_alpha
+    ) / np.maximum(alpha, 1e-6)
+    return np.round(
+        np.concatenate((rgb, alpha), axis=2) * 255
+    ).astype(np.uint8)
 
 
 class Map:
+    """The minimap, composited into one texture and drawn as one sprite.
+
+    Room cells are blended with their icons on the CPU and only the cells
+    that change are uploaded again, so the map costs the same to draw
+    however many rooms the world has.
+    """
     _player_location = (0, 0)
 
     def __init__(self, application, world, discover=False):
@@ -20,39 +42,33 @@ class Map:
         )
         self.map_window.opacity = 200
 
-        room_max = 0
-        for pos in self.world.map.keys():
-            for i in range(2):
-                if abs(pos[i]) > room_max:
-                    room_max = abs(pos[i])
+        rooms = self.application.resources["ui"]["map"]["rooms"]
+        icons = self.application.resources["ui"]["map"]["icons"]
+        self.room_images = {
+            (row, column): manifest.pixels(rooms[(row, column)])
+            for row in range(rooms.rows)
+            for column in range(rooms.columns)
+        }
+        self.icon_images = [manifest.pixels(icon) for icon in icons]
+        self.cell_size = rooms.item_width
+
+        size = (self.world.size*2 + 1) * self.cell_size
+        self.texture = pyglet.image.Texture.create(size, size)
+        self.map_sprite = pyglet.sprite.Sprite(
+            self.texture,
+            0, 0,
+            batch=self.application.ui_batch,
+            group=self.application.layers["ui"]["map_rooms"]
+        )
 
         self.map_rooms = {}
         for pos, room in self.world.map.items():
-            if discover:
-                image = self.application.resources["ui"]["map"]["rooms"][(
-                    1, room.door_value
-                )]
-            else:
-                image = self.application.resources["ui"]["map"]["rooms"][(
-                    3, room.door_value
-                )]
-            icon = self.application.resources["ui"]["map"]["icons"][room.type]
             self.map_rooms[pos] = {}
-            self.map_rooms[pos]["sprite"] = pyglet.sprite.Sprite(
-                image,
-                0, 0,
-                batch=self.application.ui_batch,
-                group=self.application.layers["ui"]["map_rooms"]
-            )
-            self.map_rooms[pos]["icon"] = pyglet.sprite.Sprite(
-                icon,
-                0, 0,
-                batch=self.application.ui_batch,
-                group=self.application.layers["ui"]["map_icons"]
-            )
-            self.map_rooms[pos]["icon"].visible = discover
+            self.map_rooms[pos]["state"] = 1 if discover else 3
+            self.map_rooms[pos]["icon"] = discover
             self.map_rooms[pos]["visited"] = discover
             self.map_rooms[pos]["room"] = room
+            self.draw_cell(pos)
 
         self.update_position()
         self.discover((0, 0))
@@ -77,45 +93,49 @@ class Map:
             )
         )
 
-        for pos in self.map_rooms.keys():
-            self.map_rooms[pos]["sprite"].scale = (
-                scale / (self.world.size / c.DEFAULT_WORLD_SIZE)
-            )
-            self.map_rooms[pos]["sprite"].update(
-                x=(
-                    self.map_window.x +
-                    self.map_window.width//2 -
-                    self.map_rooms[pos]["sprite"].width//2 +
-                    pos[0]*12 *
-                    scale/(self.world.size/c.DEFAULT_WORLD_SIZE)
-                ),
-                y=(
-                    self.map_window.y +
-                    self.map_window.height//2 -
-                    self.map_rooms[pos]["sprite"].height//2 +
-                    pos[1]*12 *
-                    scale/(self.world.size/c.DEFAULT_WORLD_SIZE)
-                )
-            )
-            self.map_rooms[pos]["icon"].scale = (
-                scale / (self.world.size / c.DEFAULT_WORLD_SIZE)
+        self.map_sprite.scale = (
+            scale / (self.world.size / c.DEFAULT_WORLD_SIZE)
+        )
+        self.map_sprite.update(
+            x=(
+                self.map_window.x +
+                self.map_window.width//2 -
+                self.map_sprite.width//2
+            ),
+            y=(
+                self.map_window.y +
+                self.map_window.height//2 -
+                self.map_sprite.height//2
             )
-            self.map_rooms[pos]["icon"].update(
-                x=(
-                    self.map_window.x +
-                    self.map_window.width//2 -
-                    self.map_rooms[pos]["icon"].width//2 +
-                    pos[0]*12 *
-                    scale/(self.world.size/c.DEFAULT_WORLD_SIZE)
-                ),
-                y=(
-                    self.map_window.y +
-                    self.map_window.height//2 -
-                    self.map_rooms[pos]["icon"].height//2 +
-                    pos[1]*12 *
-                    scale/(self.world.size/c.DEFAULT_WORLD_SIZE)
-                )
+        )
+
+    def draw_cell(self, pos):
+        """Composite a room's cell and upload it to the map texture."""
+        map_room = self.map_rooms[pos]
+        pixels = self.room_images[(
+            map_room["state"], map_room["room"].door_value
+        )]
+        if map_room["icon"]:
+            pixels = _over(
+                self.icon_images[map_room["room"].type], pixels
             )
+        self.texture.blit_into(
+            pyglet.image.ImageData(
+                self.cell_size, self.cell_size,
+                "RGBA", pixels.tobytes()
+            ),
+            (pos[0] + self.world.size) * self.cell_size,
+            (pos[1] + self.world.size) * self.cell_size,
+            0
+        )
+
+    def reveal(self, pos):
+        if self.map_rooms[pos]["visited"]:
+            self.map_rooms[pos]["state"] = 1
+        else:
+            self.map_rooms[pos]["state"] = 2
+        self.map_rooms[pos]["icon"] = True
+        self.draw_cell(pos)
 
     def discover(self, pos):
         neighbours = {
@@ -124,16 +144,7 @@ class Map:
             (0, -1): 2,
             (0, 1): 0
         }
-        if self.map_rooms[pos]["visited"]:
-            image = self.application.resources["ui"]["map"]["rooms"][(
-                1, self.map_rooms[pos]["room"].door_value
-            )]
-        else:
-            image = self.application.resources["ui"]["map"]["rooms"][(
-                2, self.map_rooms[pos]["room"].door_value
-            )]
-        self.map_rooms[pos]["sprite"].image = image
-        self.map_rooms[pos]["icon"].visible = True
+        self.reveal(pos)
 
         for (x, y), door in neighbours.items():
             n_x, n_y = x+pos[0], y+pos[1]
@@ -141,18 +152,7 @@ class Map:
                 (n_x, n_y) in self.map_rooms.keys() and
                 self.world.map[pos].doors[door]
             ):
-                if self.map_rooms[(n_x, n_y)]["visited"]:
-                    image = self.application.resources["ui"]["map"]["rooms"][(
-                        1, self.map_rooms[(n_x, n_y)]["room"].door_value
-                    )]
-                else:
-                    image = self.application.resources["ui"]["map"]["rooms"][(
-                        2, self.map_rooms[(n_x, n_y)]["room"].door_value
-                    )]
-                self.map_rooms[(
-                    n_x, n_y
-                )]["sprite"].image = image
-                self.map_rooms[(n_x, n_y)]["icon"].visible = True
+                self.reveal((n_x, n_y))
 
     def on_resize(self, width, height):
         self.update_position()
@@ -163,24 +163,18 @@ class Map:
 
     @player_location.setter
     def player_location(self, player_location):
-        image = self.application.resources["ui"]["map"]["rooms"][(
-            1, self.map_rooms[self.player_location]["room"].door_value
-        )]
-        self.map_rooms[self.player_location]["sprite"].image = image
+        self.map_rooms[self.player_location]["state"] = 1
+        self.draw_cell(self.player_location)
 
-        image = self.application.resources["ui"]["map"]["rooms"][(
-            0, self.map_rooms[player_location]["room"].door_value
-        )]
-        self.map_rooms[player_location]["sprite"].image = image
+        self.map_rooms[player_location]["state"] = 0
         self.map_rooms[player_location]["visited"] = True
-        self.map_rooms[player_location]["icon"].visible = True
+        self.map_rooms[player_location]["icon"] = True
+        self.draw_cell(player_location)
 
         self._player_location = player_location
 
     def delete(self):
         self.application.remove_handlers(self)
         self.map_window.delete()
-        for pos in self.map_rooms.keys():
-            self.map_rooms[pos]["icon"].delete()
-            self.map_rooms[pos]["sprite"].delete()
+        self.map_sprite.delete()
         del self.map_rooms
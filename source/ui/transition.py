@@ -12,6 +12,7 @@ class Transition:
         self.on_black_args = None
         self.on_done = None
         self.on_done_args = None
+        self.hold = None
 
         self.states = self.application.resources["ui"]["transition"]
         self.sprite = pyglet.sprite.Sprite(
@@ -28,9 +29,15 @@ class Transition:
     def begin(
         self,
         on_black=None, on_black_args=[],
-        on_done=None, on_done_args=[]
+        on_done=None, on_done_args=[],
+        hold=None
     ):
+        """Fade to black, call `on_black`, then fade back in.
+
+        If `hold` is given, the screen stays black until it returns False.
+        """
         self.state = "fade_out"
+        self.hold = hold
 
         self.on_black = on_black
         self.on_black_args = on_black_args
@@ -51,6 +58,12 @@ class Transition:
         if state == "fade_out":
             self.sprite.visible = True
 
+    def set_states(self, states):
+        """Swap in new animations, such as once placeholders have loaded."""
+        self.states = states
+        self.sprite.image = self.states[self.state]
+        self.update_position()
+
     def update_position(self):
         self.sprite.scale = max(
             self.application.window.width /
@@ -63,6 +76,9 @@ class Transition:
         if self.state == "fade_out":
             self.state = "black"
         elif self.state == "black":
+            if self.hold is not None and self.hold():
+                self.state = "black"
+                return
             if self.on_black is not None:
                 self.on_black(*self.on_black_args)
             del self.on_black, self.on_black_args